@@ -7,12 +7,58 @@ Use This Script to
     3. preprocess the scraped data
     4. load the preprocessed data to GCP BigQuery
 """
-from data_extractor import collect_news
-from preprocessor import extract_and_preprocess,combine_data,create_table_from_csv_direct
+from data_extractor import collect_news,iter_news
+from preprocessor import extract_and_preprocess,combine_data,build_embedding_index,precompute_summaries
+from preprocessor.streaming import run_streaming_etl,BigQuerySink,ParquetSink
+from common.data_io import NEWS_PATH
+from common.metrics import metrics
+import os
 import pandas as pd 
 
-def extract_data_upload_bq():
-    print(collect_news())
-    print(extract_and_preprocess())
-    print(combine_data())
-    print(create_table_from_csv_direct('./data/news.csv'))
+
+def report_metrics():
+    """
+    Print the run's stage timings and counters.
+    METRICS_EXPORT=path writes them as JSON lines; METRICS_PROMETHEUS=path writes
+    Prometheus text (e.g. for node_exporter's textfile collector).
+    """
+    print(metrics.summary())
+    if os.environ.get("METRICS_EXPORT"):
+        metrics.export_jsonl(os.environ["METRICS_EXPORT"])
+    if os.environ.get("METRICS_PROMETHEUS"):
+        with open(os.environ["METRICS_PROMETHEUS"], "w") as f:
+            f.write(metrics.to_prometheus())
+
+def extract_data_upload_bq(load_mode='incremental', export_csv=False, summarize=True):
+    """
+    load_mode:
+        'incremental' -> MERGE only new/changed rows into the partitioned news_data table
+        'full'        -> replace news_data with ./data/news.parquet (WRITE_TRUNCATE)
+    export_csv: also write a CSV copy of every stage file for debugging
+    summarize: precompute a heading/summary per article so the agent can skip the LLM for it
+    """
+    with metrics.span("etl.run", load_mode=load_mode):
+        print(collect_news(export_csv=export_csv))
+        print(extract_and_preprocess(export_csv=export_csv))
+        print(combine_data(export_csv=export_csv))
+        if summarize:
+            print(precompute_summaries(NEWS_PATH))
+        print(build_embedding_index(NEWS_PATH))
+        # The loaders pull in google.cloud.bigquery; import them only when a load runs
+        from preprocessor import create_table_from_csv_direct,load_incremental
+        if load_mode == 'incremental':
+            print(load_incremental(NEWS_PATH))
+        else:
+            print(create_table_from_csv_direct(NEWS_PATH))
+    report_metrics()
+
+
+def stream_data_upload_bq(chunk_size=200, sink='bigquery', summarize=True):
+    """
+    Streaming variant: articles flow from SerpApi through scrape/NLP/filter in
+    chunks of `chunk_size`, and each chunk is flushed as soon as it is ready.
+    sink: 'bigquery' (incremental MERGE per chunk) or 'parquet' (./data/news.parquet)
+    """
+    sink = BigQuerySink() if sink == 'bigquery' else ParquetSink()
+    print(run_streaming_etl(iter_news(), sink, chunk_size=chunk_size, summarize=summarize))
+    report_metrics()
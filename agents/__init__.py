@@ -1 +1,2 @@
-from .graph import graph
\ No newline at end of file
+from .graph import graph,cached_invoke
+from .streaming import stream_events
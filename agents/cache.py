@@ -0,0 +1,133 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from common.embeddings import embed
+
+PUNCTUATION_RE = re.compile(r"[^\w\s]")
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(text):
+    """Case-, punctuation- and whitespace-insensitive form of a user question."""
+    return WHITESPACE_RE.sub(" ", PUNCTUATION_RE.sub(" ", str(text).lower())).strip()
+
+
+def conversation_key(messages):
+    """Normalized text of every user turn; plain strings count as user turns, as in graph inputs."""
+    from langchain_core.messages import HumanMessage
+    if not isinstance(messages, list):
+        messages = [messages]
+    turns = [m if isinstance(m, str) else m.content for m in messages if isinstance(m, (str, HumanMessage))]
+    return normalize_query(" \n ".join(turns))
+
+
+def content_key(*parts):
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire `ttl` seconds after being stored."""
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def items(self):
+        now = time.monotonic()
+        with self._lock:
+            return [(key, value) for key, (expires, value) in self._data.items() if expires >= now]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SemanticResponseCache:
+    """
+    Final-answer cache keyed on (dataset version, normalized conversation).
+
+    On an exact miss, the question is embedded and compared against cached
+    questions from the same dataset version; a cosine similarity of at least
+    `similarity` counts as a paraphrase hit. Set `similarity=None` for exact matching only.
+    """
+
+    def __init__(self, maxsize=256, ttl=3600, similarity=0.9, embedding_backend=None):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.similarity = similarity
+        self.embedding_backend = embedding_backend
+
+    def get(self, question, version):
+        normalized = normalize_query(question)
+        hit = self.entries.get((version, normalized))
+        if hit is not None or self.similarity is None:
+            return None if hit is None else hit[1]
+        candidates = [(key, value) for key, value in self.entries.items() if key[0] == version]
+        if not candidates:
+            return None
+        query_vector = embed([normalized], self.embedding_backend)[0]
+        vectors = np.stack([value[0] for _, value in candidates])
+        best = int(np.argmax(vectors @ query_vector))
+        if float(vectors[best] @ query_vector) >= self.similarity:
+            # Paraphrase hit: count it as a hit rather than the exact-key miss recorded above
+            self.entries.misses -= 1
+            self.entries.hits += 1
+            return candidates[best][1][1]
+        return None
+
+    def set(self, question, version, response):
+        normalized = normalize_query(question)
+        vector = embed([normalized], self.embedding_backend)[0] if self.similarity is not None else None
+        self.entries.set((version, normalized), (vector, response))
+
+
+CACHE_TTL = float(os.environ.get("AGENT_CACHE_TTL", 3600))
+# Paraphrase matching is opt-in: it needs real semantic embeddings (EMBEDDING_BACKEND=gemini),
+# the offline hashing embedding scores "latest AI news" and "latest sports news" as close
+CACHE_SIMILARITY = os.environ.get("AGENT_CACHE_SIMILARITY")
+
+# One instance per level, shared by the graph nodes and `cached_invoke`
+decision_cache = TTLCache(maxsize=1024, ttl=CACHE_TTL)
+retrieval_cache = TTLCache(maxsize=1024, ttl=CACHE_TTL)
+summary_cache = TTLCache(maxsize=4096, ttl=CACHE_TTL)
+# BigQuery result rows by (query, table version, parameters), for every caller of Bq_tools
+query_cache = TTLCache(maxsize=512, ttl=CACHE_TTL)
+response_cache = SemanticResponseCache(maxsize=256, ttl=CACHE_TTL,
+                                       similarity=float(CACHE_SIMILARITY) if CACHE_SIMILARITY else None)
+
+
+def cache_stats():
+    return {
+        name: {"hits": cache.hits, "misses": cache.misses}
+        for name, cache in [("decision", decision_cache), ("retrieval", retrieval_cache),
+                            ("summary", summary_cache), ("query", query_cache),
+                            ("response", response_cache.entries)]
+    }
@@ -0,0 +1,58 @@
+import json
+import os
+
+import numpy as np
+
+from common.data_io import read_frame
+from common.embeddings import embed
+
+RESULT_COLUMNS = ["headline", "extracted_text", "sentiment_score", "sentiment_magnitude", "entities",
+                  "heading", "summary", "summarized_at"]
+
+
+class EmbeddingIndex:
+    """
+    Exact cosine top-k over a memory-mapped matrix of article vectors.
+
+    Vectors are L2-normalized at build time, so cosine similarity is a dot
+    product. Queries are embedded in one batch and scored against the matrix
+    block by block (`block_size` rows at a time), which keeps memory bounded
+    however large the mapped file grows.
+    """
+
+    def __init__(self, vectors, rows, backend, block_size=65536):
+        self.vectors = vectors
+        self.rows = rows
+        self.backend = backend
+        self.block_size = block_size
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, 'info.json')) as f:
+            info = json.load(f)
+        vectors = np.load(os.path.join(directory, 'vectors.npy'), mmap_mode='r')
+        rows = read_frame(os.path.join(directory, 'rows.parquet')).to_dict(orient='records')
+        return cls(vectors, rows, info['backend'])
+
+    def top_k(self, query_vectors, k=5):
+        """Return (indices, scores), each shaped (n_queries, k), best first."""
+        n_queries = query_vectors.shape[0]
+        k = min(k, self.vectors.shape[0])
+        best_scores = np.full((n_queries, k), -np.inf, dtype=np.float32)
+        best_indices = np.zeros((n_queries, k), dtype=np.int64)
+        for start in range(0, self.vectors.shape[0], self.block_size):
+            block = np.asarray(self.vectors[start:start + self.block_size])
+            scores = np.concatenate([best_scores, query_vectors @ block.T], axis=1)
+            indices = np.concatenate([best_indices, np.broadcast_to(np.arange(start, start + block.shape[0]), (n_queries, block.shape[0]))], axis=1)
+            keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, keep, axis=1)
+            best_indices = np.take_along_axis(indices, keep, axis=1)
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best_indices, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def search(self, queries, k=5):
+        """Batched semantic search: one list of result records per query string."""
+        if not len(self.rows):
+            return [[] for _ in queries]
+        indices, _ = self.top_k(embed(queries, self.backend), k)
+        return [[{column: self.rows[i].get(column) for column in RESULT_COLUMNS} for i in row] for row in indices]
@@ -1 +1,10 @@
-from .chains import decision_chain,news_summarizer_chain
\ No newline at end of file
+from .chains import get_decision_chain,get_news_summarizer_chain
+from .prompts import format_article
+
+
+def __getattr__(name):
+    # Backwards-compatible `from agents.llm_chains import decision_chain`, built on first access
+    if name in ("decision_chain", "news_summarizer_chain"):
+        from . import chains
+        return getattr(chains, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,7 +1,24 @@
+from common import backends
 from .prompts import decision_prompt_template,news_summarizer_prompt_template
-from .llm import llm,precise_llm
+from . import llm  # registers the LLM factories
 from .structred_outputs import decision,news_summarizer 
+from .usage import usage_callback
 
 
-decision_chain=decision_prompt_template|precise_llm.with_structured_output(decision)
-news_summarizer_chain=news_summarizer_prompt_template| llm.with_structured_output(news_summarizer)
+# The usage callback counts calls and tokens for whichever LLM backend is registered
+backends.register("decision_chain", lambda: (decision_prompt_template|backends.get("precise_llm").with_structured_output(decision)).with_config(callbacks=[usage_callback]))
+backends.register("news_summarizer_chain", lambda: (news_summarizer_prompt_template| backends.get("llm").with_structured_output(news_summarizer)).with_config(callbacks=[usage_callback]))
+
+
+def get_decision_chain():
+    return backends.get("decision_chain")
+
+
+def get_news_summarizer_chain():
+    return backends.get("news_summarizer_chain")
+
+
+def __getattr__(name):
+    if name in ("decision_chain", "news_summarizer_chain"):
+        return backends.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,3 +1,20 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-precise_llm=ChatGoogleGenerativeAI(model= "gemini-2.5-flash",temperature=0.0)
-llm = ChatGoogleGenerativeAI(model= "gemini-2.5-flash")
\ No newline at end of file
+from common import backends
+
+
+def _gemini(**kwargs):
+    def factory():
+        # langchain_google_genai is slow to import and needs credentials, so wait for the first call
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(model= "gemini-2.5-flash", **kwargs)
+    return factory
+
+
+backends.register("precise_llm", _gemini(temperature=0.0))
+backends.register("llm", _gemini())
+
+
+def __getattr__(name):
+    # `llm` / `precise_llm` are still importable by name; they are built on first access
+    if name in ("llm", "precise_llm"):
+        return backends.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,12 +1,32 @@
+import math
+import os
 from langchain_core.prompts import ChatPromptTemplate
+from common.data_io import as_entities
 
-with open('./agents/llm_chains/prompts/decision_llm.txt') as f:
+# Resolved from this file so the package imports from any working directory
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompts')
+
+with open(os.path.join(PROMPTS_DIR, 'decision_llm.txt')) as f:
     decision_prompt=f.read()
 
-with open('./agents/llm_chains/prompts/news_summarizer.txt')as f:
+with open(os.path.join(PROMPTS_DIR, 'news_summarizer.txt'))as f:
     news_summarizer=f.read()
     
 decision_prompt_template=ChatPromptTemplate.from_messages([("system",decision_prompt),("placeholder","{messages}")])
 
 news_summarizer_prompt_template=ChatPromptTemplate.from_messages([("system",news_summarizer),("placeholder","{messages}")])
 
+# Entities are stored most salient first; the long tail adds tokens, not context
+PROMPT_ENTITIES = int(os.environ.get("PROMPT_ENTITIES", 8))
+
+def format_article(i):
+    """Render a news_data row as the summarizer's input message (shared by the graph and the ETL)."""
+    lines = [f'{i["headline"]} ', str(i["extracted_text"])]
+    score, magnitude = i.get("sentiment_score"), i.get("sentiment_magnitude")
+    if score is not None and not math.isnan(score):
+        lines.append(f'Sentiment: {score:+.2f} (magnitude {magnitude:.1f})')
+    entities = as_entities(i.get("entities"))[:PROMPT_ENTITIES]
+    if entities:
+        lines.append('Entities: ' + ', '.join(f'{e["name"]} {e["salience"]:.2f}' for e in entities))
+    return '\n'.join(lines)
+
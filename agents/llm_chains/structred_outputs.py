@@ -3,8 +3,8 @@ from pydantic import BaseModel, Field
 
 
 class decision(BaseModel):
-    search_type:Literal['by_category','by_search_term']=Field(description="whether the search type should be by category or search term (keyword)")
-    query_term:str=Field(description="the specic search term for category or the specific keyword for keyword search, #Important: the term should be only one word")
+    search_type:Literal['by_category','by_search_term','semantic']=Field(description="whether the search type should be by category, search term (keyword) or semantic (a descriptive question that no single word captures)")
+    query_term:str=Field(description="the specic search term for category or the specific keyword for keyword search, #Important: the term should be only one word for category and keyword search; for semantic search use a short descriptive phrase of what the user wants")
 
 class news_summarizer(BaseModel):
     heading:str=Field(content="Relevant Heading")
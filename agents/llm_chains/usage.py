@@ -0,0 +1,21 @@
+from langchain_core.callbacks import BaseCallbackHandler
+
+from common.metrics import metrics
+
+
+class UsageCallback(BaseCallbackHandler):
+    """Counts LLM calls, errors and input/output tokens (from usage_metadata) into `metrics`."""
+
+    def on_llm_end(self, response, **kwargs):
+        metrics.incr("llm.calls")
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                metrics.incr("llm.input_tokens", usage.get("input_tokens", 0))
+                metrics.incr("llm.output_tokens", usage.get("output_tokens", 0))
+
+    def on_llm_error(self, error, **kwargs):
+        metrics.incr("llm.errors", error=type(error).__name__)
+
+
+usage_callback = UsageCallback()
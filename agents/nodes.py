@@ -1,8 +1,14 @@
 from .states import State,WorkerState
-from .llm_chains import decision_chain,news_summarizer_chain
+from .llm_chains import get_decision_chain,get_news_summarizer_chain,format_article
 from .tools import toolkit
+from .cache import decision_cache,retrieval_cache,summary_cache,conversation_key,content_key
+from .scheduler import scheduler,select_sections,BudgetExceeded,LATENCY_BUDGET
+from common.metrics import metrics
+from common.data_io import SUMMARY_MAX_AGE
 from langgraph.constants import Send
 from langchain_core.messages import AIMessage,HumanMessage
+import time
+import pandas as pd
 
 def ensure_last_message_is_user(messages):
     if not isinstance(messages, list):
@@ -14,28 +20,89 @@ def ensure_last_message_is_user(messages):
     return messages
 
 
-def decision_agent(state: State):
-    decision=decision_chain.invoke({"messages":state["messages"]})
+def precomputed_section(i):
+    """The ETL-precomputed summary of a row as a finished section, or None if missing/stale."""
+    summarized_at = i.get("summarized_at")
+    if not i.get("summary") or summarized_at is None or pd.isna(summarized_at):
+        return None
+    if time.time() - pd.Timestamp(summarized_at).timestamp() > SUMMARY_MAX_AGE:
+        return None
+    return AIMessage(content=f'# {i["heading"]} \n {i["summary"]}')
+
+def retrieve(decision):
     if decision.search_type=="by_category":
-        search_results=[HumanMessage(content=f'{i["headline"]} \n{i["extracted_text"]}\nSentiment:{i["sentiment"]}\nEntities:{i["entities"]}' )for i in toolkit.get_news_by_category(decision.query_term)]
-  
+        return toolkit.get_news_by_category(decision.query_term)
     elif decision.search_type=="by_search_term":
-        search_results=[HumanMessage(content=f'{i["headline"]} \n{i["extracted_text"]}\nSentiment:{i["sentiment"]}\nEntities:{i["entities"]}' ) for i in toolkit.get_news_by_search_term(decision.query_term)]
-    return {"planned_sections": search_results}
+        return toolkit.get_news_by_search_term(decision.query_term)
+    elif decision.search_type=="semantic":
+        return toolkit.get_news_by_semantic_query(decision.query_term)
+    return []
+
+@metrics.timed("graph.decision_agent")
+def decision_agent(state: State):
+    # Decisions depend only on the conversation; retrieval also on which ETL load is being served
+    question=conversation_key(state["messages"])
+    decision=decision_cache.get(question)
+    if decision is None:
+        decision=get_decision_chain().invoke({"messages":state["messages"]})
+        decision_cache.set(question, decision)
+    retrieval_key=(toolkit.dataset_version(), decision.search_type, decision.query_term.lower())
+    rows=retrieval_cache.get(retrieval_key)
+    if rows is None:
+        rows=retrieve(decision)
+        retrieval_cache.set(retrieval_key, rows)
+    # Fresh precomputed summaries go straight to completed_sections; only misses reach the LLM workers
+    misses,precomputed=[],[]
+    for i in rows:
+        section=precomputed_section(i)
+        if section is None:
+            misses.append(i)
+        else:
+            precomputed.append(section)
+    # Over the token budget, the least salient misses are dropped; the rest keep their salience rank
+    selected,dropped=select_sections(misses, format_article)
+    if dropped:
+        print(f'token budget: dropped {dropped} low-salience sections')
+        metrics.incr("sections.dropped", dropped, reason="token_budget")
+    search_results=[HumanMessage(content=format_article(i)) for _,i in selected]
+    return {"planned_sections": search_results, "section_priorities": [priority for priority,_ in selected],
+            "completed_sections": precomputed,
+            "search_decision": decision, "headlines": [i["headline"] for i in rows]}
 
+@metrics.timed("graph.news_summarizer")
 def news_summarizer(workerstate: WorkerState):
     section = workerstate['worker_section']
     if not isinstance(section, list):
         section = [section]
-    output = news_summarizer_chain.invoke({"messages": section})
-    output = AIMessage(content=f'# {output.heading} \n {output.summary}')
+    # Summaries are a function of the article text alone, so they are keyed by content
+    key = content_key(*(m.content for m in section))
+    output = summary_cache.get(key)
+    if output is None:
+        def summarize():
+            result = get_news_summarizer_chain().invoke({"messages": section})
+            return AIMessage(content=f'# {result.heading} \n {result.summary}')
+        try:
+            # Concurrent identical sections share one call; the scheduler caps parallel calls
+            output = scheduler.run(key, summarize, workerstate.get('priority', 0), workerstate.get('deadline'))
+        except BudgetExceeded as e:
+            print(f'latency budget: {e}')
+            metrics.incr("sections.dropped", reason="latency_budget")
+            return {"completed_sections": []}
+        summary_cache.set(key, output)
     return {"completed_sections": [output]}
 
 
 def assign_workers(state: State):
     print('assinging workers')
-    return [Send("worker", {"worker_section": section}) for section in state["planned_sections"]]
+    if not state["planned_sections"]:
+        # Every article had a precomputed summary
+        return "synthesizer"
+    deadline = time.time() + LATENCY_BUDGET
+    priorities = state.get("section_priorities") or [0] * len(state["planned_sections"])
+    return [Send("worker", {"worker_section": section, "priority": priority, "deadline": deadline})
+            for section, priority in zip(state["planned_sections"], priorities)]
 
+@metrics.timed("graph.synthesizer")
 def synthesizer(state: State):
     print('synthesizing')
     completed_sections=[i.content for i in state['completed_sections']]
@@ -0,0 +1,114 @@
+"""
+Prepared, parameterized retrieval queries against news_data.
+
+Values (the LLM's query term, look-back window, limit) only ever travel as
+BigQuery query parameters, never inside the SQL text. Each template is
+rendered once per (table, partitioned) and reused. Every query:
+
+* filters on the ingested_at partition column (last NEWS_LOOKBACK_DAYS days),
+  so BigQuery prunes older partitions
+* reads only the columns it returns or filters on
+* is capped by maximum_bytes_billed (BQ_MAX_BYTES_BILLED); a query over the
+  cap returns no rows instead of scanning the table
+* streams rows through the job's row iterator instead of a DataFrame
+* is cached process-wide by (template, table version, parameters)
+"""
+import os
+
+from common.metrics import metrics, record_bigquery_job
+from .cache import query_cache
+
+LOOKBACK_DAYS = int(os.environ.get("NEWS_LOOKBACK_DAYS", 7))
+MAX_BYTES_BILLED = int(os.environ.get("BQ_MAX_BYTES_BILLED", 1 << 30))
+RESULT_COLUMNS = ("headline, extracted_text, sentiment_score, sentiment_magnitude, entities, "
+                  "heading, summary, summarized_at")
+PARTITION_FILTER = "ingested_at >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL @lookback_days DAY)"
+
+
+class QueryTemplate:
+    """SQL with a `{table}` and `{partition_filter}` slot plus the BigQuery types of its parameters."""
+
+    def __init__(self, name, sql, **param_types):
+        self.name = name
+        self.sql = sql
+        self.param_types = param_types
+        self._rendered = {}
+
+    def render(self, table_ref, partitioned=True):
+        key = (table_ref, partitioned)
+        if key not in self._rendered:
+            # Tables written by the full loader have no ingested_at partitions to prune
+            self._rendered[key] = self.sql.format(table=table_ref,
+                                                  partition_filter=PARTITION_FILTER if partitioned else "TRUE")
+        return self._rendered[key]
+
+    def job_config(self, params, partitioned=True, maximum_bytes_billed=MAX_BYTES_BILLED):
+        from google.cloud import bigquery
+        query_parameters = []
+        for name, type_ in self.param_types.items():
+            if name == "lookback_days" and not partitioned:
+                continue
+            if type_.startswith("ARRAY<"):
+                query_parameters.append(bigquery.ArrayQueryParameter(name, type_[6:-1], params[name]))
+            else:
+                query_parameters.append(bigquery.ScalarQueryParameter(name, type_, params[name]))
+        return bigquery.QueryJobConfig(query_parameters=query_parameters, maximum_bytes_billed=maximum_bytes_billed)
+
+
+NEWS_BY_CATEGORY = QueryTemplate("news_by_category", f"""
+    SELECT {RESULT_COLUMNS}
+    FROM {{table}}
+    WHERE {{partition_filter}}
+    AND (CONTAINS_SUBSTR(category, @category)
+         OR @category IN UNNEST(categories)
+         OR CONTAINS_SUBSTR(detailed_category, @category))
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY COALESCE(cluster_id, url)) = 1
+    LIMIT @limit
+    """, category="STRING", lookback_days="INT64", limit="INT64")
+
+NEWS_BY_SEARCH_TERM = QueryTemplate("news_by_search_term", f"""
+    SELECT {RESULT_COLUMNS}
+    FROM {{table}}
+    WHERE {{partition_filter}}
+    AND EXISTS(SELECT 1 FROM UNNEST(entities) AS e
+               WHERE LOWER(e.name) = LOWER(@search_term) AND e.salience >= @min_salience)
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY COALESCE(cluster_id, url)) = 1
+    LIMIT @limit
+    """, search_term="STRING", min_salience="FLOAT64", lookback_days="INT64", limit="INT64")
+
+# Semantic search without vectors: articles mentioning the most of the question's keywords
+KEYWORD_MATCHES = "(SELECT COUNT(1) FROM UNNEST(@keywords) AS k WHERE CONTAINS_SUBSTR(headline, k) OR CONTAINS_SUBSTR(extracted_text, k))"
+NEWS_BY_KEYWORDS = QueryTemplate("news_by_keywords", f"""
+    SELECT {RESULT_COLUMNS}
+    FROM {{table}}
+    WHERE {{partition_filter}}
+    AND {KEYWORD_MATCHES} > 0
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY COALESCE(cluster_id, url)) = 1
+    ORDER BY {KEYWORD_MATCHES} DESC
+    LIMIT @limit
+    """, keywords="ARRAY<STRING>", lookback_days="INT64", limit="INT64")
+
+
+def run_query(client, template, table_ref, version, partitioned=True, **params):
+    """Rows (dicts) of `template` with `params`, served from query_cache while `version` is current."""
+    params.setdefault("lookback_days", LOOKBACK_DAYS)
+    key = (template.name, table_ref, version, tuple(sorted(params.items())))
+    rows = query_cache.get(key)
+    if rows is not None:
+        metrics.incr("bq.query_cache", outcome="hit", query=template.name)
+        return rows
+    metrics.incr("bq.query_cache", outcome="miss", query=template.name)
+    from google.api_core.exceptions import BadRequest
+    try:
+        job = client.query(template.render(table_ref, partitioned),
+                           job_config=template.job_config(params, partitioned))
+        rows = [dict(row.items()) for row in job.result()]
+    except BadRequest as e:
+        if "bytes billed" not in str(e).lower():
+            raise
+        print(f"{template.name}: {e}")
+        metrics.incr("bq.bytes_limit_exceeded", query=template.name)
+        return []
+    record_bigquery_job(job, template.name)
+    query_cache.set(key, rows)
+    return rows
@@ -0,0 +1,188 @@
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from google.api_core import exceptions as google_exceptions
+
+from common.data_io import as_entities
+
+MAX_CONCURRENCY = int(os.environ.get("WORKER_MAX_CONCURRENCY", 4))
+# Per-question budgets for the summarizer fan-out
+TOKEN_BUDGET = int(os.environ.get("WORKER_TOKEN_BUDGET", 12000))
+LATENCY_BUDGET = float(os.environ.get("WORKER_LATENCY_BUDGET", 30))
+MAX_SECTIONS = int(os.environ.get("WORKER_MAX_SECTIONS", 10))
+
+RATE_LIMIT_ERRORS = (google_exceptions.TooManyRequests, google_exceptions.ResourceExhausted)
+
+
+class BudgetExceeded(Exception):
+    """Raised when a section cannot start (or finish waiting) before its request's deadline."""
+
+
+def estimate_tokens(text):
+    # ~4 characters per token is close enough for budgeting Gemini prompts
+    return len(text) // 4 + 1
+
+
+def salience(row):
+    """Highest entity salience of a retrieved row; 0 when it has no entities."""
+    return max((entity["salience"] for entity in as_entities(row.get("entities"))), default=0.0)
+
+
+def select_sections(rows, render, token_budget=TOKEN_BUDGET, max_sections=MAX_SECTIONS):
+    """
+    Pick the rows to summarize within the token budget.
+
+    Rows are admitted by descending salience until the estimated prompt tokens
+    of `render(row)` would exceed `token_budget` (the most salient row is always
+    kept). Returns [(priority, row)] in retrieval order and the number dropped;
+    priority 0 is the most salient.
+    """
+    ranked = sorted(range(len(rows)), key=lambda i: -salience(rows[i]))
+    kept, spent = {}, 0
+    for priority, i in enumerate(ranked):
+        cost = estimate_tokens(render(rows[i]))
+        if kept and (spent + cost > token_budget or len(kept) >= max_sections):
+            continue
+        kept[i] = priority
+        spent += cost
+    return [(kept[i], rows[i]) for i in sorted(kept)], len(rows) - len(kept)
+
+
+def is_rate_limited(error):
+    if isinstance(error, RATE_LIMIT_ERRORS):
+        return True
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return code == 429 or "RESOURCE_EXHAUSTED" in str(error)
+
+
+class _PriorityGate:
+    """Semaphore whose waiters are admitted lowest-priority-number first."""
+
+    def __init__(self, slots):
+        self.slots = slots
+        self._waiting = []
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+
+    def acquire(self, priority=0, timeout=None):
+        ticket = (priority, next(self._order))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            heapq.heappush(self._waiting, ticket)
+            while self.slots == 0 or self._waiting[0] != ticket:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self._condition.notify_all()
+                    return False
+                self._condition.wait(remaining)
+            heapq.heappop(self._waiting)
+            self.slots -= 1
+            return True
+
+    def release(self):
+        with self._condition:
+            self.slots += 1
+            self._condition.notify_all()
+
+
+class WorkerScheduler:
+    """
+    Shared gate in front of the summarizer LLM calls.
+
+    * at most `max_concurrency` calls run at once, across all graph runs;
+      waiting sections start in priority (salience) order
+    * identical inputs already in flight are coalesced onto one call
+    * a 429 pauses every caller (shared cooldown) before a jittered
+      exponential-backoff retry
+    * sections that cannot start before their deadline raise BudgetExceeded,
+      including when the cooldown before a retry would outlast the deadline
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, retries=4, backoff_base=1.0, backoff_cap=16.0):
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.calls = 0
+        self.coalesced = 0
+        self.rate_limited = 0
+        self.dropped = 0
+        self._gate = _PriorityGate(max_concurrency)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._cooldown_until = 0.0
+
+    def run(self, key, fn, priority=0, deadline=None):
+        """`fn()` for `key`, sharing the result with concurrent callers of the same key."""
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not owner:
+            try:
+                return future.result(timeout=self._remaining(deadline))
+            except FutureTimeout:
+                self._drop()
+                raise BudgetExceeded(f"section {key[:12]} still pending at the deadline")
+        try:
+            result = self._call(fn, priority, deadline)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def stats(self):
+        return {"calls": self.calls, "coalesced": self.coalesced,
+                "rate_limited": self.rate_limited, "dropped": self.dropped}
+
+    def _remaining(self, deadline):
+        return None if deadline is None else max(0.0, deadline - time.time())
+
+    def _drop(self):
+        with self._lock:
+            self.dropped += 1
+
+    def _call(self, fn, priority, deadline):
+        for attempt in range(self.retries + 1):
+            delay = self._cooldown_until - time.monotonic()
+            remaining = self._remaining(deadline)
+            if remaining is not None and (remaining <= 0 or delay >= remaining):
+                # The budget is spent, or sleeping out the cooldown would only end past it
+                self._drop()
+                raise BudgetExceeded(f"deadline reached before attempt {attempt + 1} could start (priority {priority})")
+            if delay > 0:
+                time.sleep(delay)
+            if not self._gate.acquire(priority, timeout=self._remaining(deadline)):
+                self._drop()
+                raise BudgetExceeded(f"no worker slot before the deadline (priority {priority})")
+            try:
+                with self._lock:
+                    self.calls += 1
+                return fn()
+            except Exception as e:
+                if attempt == self.retries or not is_rate_limited(e):
+                    raise
+                backoff = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+                with self._lock:
+                    self.rate_limited += 1
+                    self._cooldown_until = max(self._cooldown_until, time.monotonic() + backoff)
+            finally:
+                self._gate.release()
+
+
+# Shared by every graph run so the cap and coalescing span concurrent users
+scheduler = WorkerScheduler()
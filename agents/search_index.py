@@ -0,0 +1,129 @@
+import math
+import os
+import re
+import time
+from collections import Counter, defaultdict
+
+from common.data_io import as_entities, read_frame
+
+TOKEN_RE = re.compile(r"\w+")
+RESULT_COLUMNS = ["headline", "extracted_text", "sentiment_score", "sentiment_magnitude", "entities",
+                  "heading", "summary", "summarized_at"]
+# Entity mentions below this salience are passing references, not what the article is about
+MIN_ENTITY_SALIENCE = float(os.environ.get("ENTITY_MIN_SALIENCE", 0.01))
+# Question words that would match every article in a keyword search
+STOPWORDS = frozenset("""
+    a about after all an and any are as at be been by can did do does for from get had has have how i in
+    is it its latest me new news of on or our recent show tell than that the their them there these this to
+    today was were what when where which who why will with would you your
+""".split())
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text).lower())
+
+
+def keywords(text, limit=8):
+    """The distinct content words of a free-form question, in order (for keyword fallbacks)."""
+    return list(dict.fromkeys(token for token in tokenize(text) if token not in STOPWORDS and len(token) > 1))[:limit]
+
+
+class NewsIndex:
+    """
+    In-memory retrieval index over one ETL snapshot of news_data.
+
+    * text: BM25 inverted index over headline + extracted_text
+    * entities: lowercased entity name -> [(doc, salience)]
+    * categories: category / categories / detailed_category labels -> docs
+
+    Lookups mirror the BigQuery queries (case-insensitive exact entity name
+    above a salience threshold; substring on category labels) and return one
+    article per near-duplicate cluster.
+    """
+
+    def __init__(self, records, source_version=None, snapshot_at=None, k1=1.5, b=0.75):
+        self.docs = records
+        self.source_version = source_version
+        # When the underlying data was captured (file mtime / table snapshot time)
+        self.snapshot_at = snapshot_at or time.time()
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)    # term -> [(doc, term frequency)]
+        self.doc_lengths = []
+        self.entity_index = defaultdict(list)  # lowercased entity name -> [(doc, salience)]
+        self.category_index = defaultdict(set)  # lowercased category label -> {doc}
+        for doc_id, record in enumerate(records):
+            tokens = tokenize(f"{record.get('headline', '')} {record.get('extracted_text', '')}")
+            self.doc_lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                self.postings[term].append((doc_id, frequency))
+            record['entities'] = as_entities(record.get('entities'))
+            for entity in record['entities']:
+                self.entity_index[entity['name'].lower()].append((doc_id, entity['salience']))
+            labels = [record.get('category'), record.get('detailed_category')] + list(record.get('categories') or [])
+            for label in labels:
+                if label:
+                    self.category_index[str(label).lower()].add(doc_id)
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+
+    @classmethod
+    def from_frame(cls, df, source_version=None, snapshot_at=None):
+        return cls(df.to_dict(orient='records'), source_version=source_version, snapshot_at=snapshot_at)
+
+    @classmethod
+    def from_parquet(cls, path):
+        modified = os.path.getmtime(path)
+        return cls.from_frame(read_frame(path), source_version=modified, snapshot_at=modified)
+
+    def bm25(self, query):
+        """BM25 score for every document matching at least one query term."""
+        scores = defaultdict(float)
+        n_docs = len(self.docs)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / (self.avg_length or 1))
+                scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return scores
+
+    def _top(self, candidates, limit):
+        """Best-first candidates ({doc: score}), keeping one article per cluster."""
+        results, seen_clusters = [], set()
+        for doc_id in sorted(candidates, key=lambda doc: (-candidates[doc], doc)):
+            record = self.docs[doc_id]
+            cluster = record.get('cluster_id') or record.get('url')
+            if cluster in seen_clusters:
+                continue
+            seen_clusters.add(cluster)
+            results.append({column: record.get(column) for column in RESULT_COLUMNS})
+            if len(results) == limit:
+                break
+        return results
+
+    def search_by_category(self, category, limit=5):
+        needle = category.lower()
+        matched = set()
+        for label, doc_ids in self.category_index.items():
+            if needle in label:
+                matched |= doc_ids
+        text_scores = self.bm25(category)
+        return self._top({doc_id: text_scores.get(doc_id, 0.0) for doc_id in matched}, limit)
+
+    def search_by_entity(self, term, limit=5, min_salience=MIN_ENTITY_SALIENCE):
+        salience = defaultdict(float)
+        for doc_id, value in self.entity_index.get(term.lower().strip(), []):
+            if value >= min_salience:
+                salience[doc_id] = max(salience[doc_id], value)
+        text_scores = self.bm25(term)
+        # Salient mentions first; BM25 breaks ties between similarly salient articles
+        return self._top({doc_id: value * (1 + text_scores.get(doc_id, 0.0)) for doc_id, value in salience.items()}, limit)
+
+    def search_by_text(self, query, limit=5):
+        """BM25 over headline + text for a free-form question."""
+        return self._top(self.bm25(" ".join(keywords(query))), limit)
+
+    def is_stale(self, max_age):
+        return time.time() - self.snapshot_at > max_age
@@ -0,0 +1,73 @@
+import time
+
+from langchain_core.messages import AIMessageChunk
+
+from .graph import graph
+from .tools import toolkit
+from .cache import response_cache, conversation_key
+
+
+def _text(message):
+    return message if isinstance(message, str) else message.content
+
+
+def stream_events(inputs, config=None, app=None):
+    """
+    Run the graph and yield progress events as soon as they happen.
+
+    Events are dicts with an `event` key, in this order:
+        decision  -> search_type / query_term chosen by the orchestrator
+        headlines -> the retrieved articles
+        token     -> summarizer output chunks (with the worker `task`), when the model streams plain text
+        section   -> one finished summary (precomputed ones come first)
+        report    -> the ordered final report, plus time_to_first_section
+    Every event carries `elapsed`, seconds since the call started.
+    A repeat conversation against the same ETL load yields only the cached report.
+    """
+    app = app or graph
+    started = time.perf_counter()
+    messages = inputs["messages"] if isinstance(inputs["messages"], list) else [inputs["messages"]]
+    key = conversation_key(messages)
+    version = toolkit.dataset_version()
+    cached = response_cache.get(key, version)
+    if cached is not None:
+        yield {"event": "report", "report": cached["report"], "cached": True,
+               "time_to_first_section": None, "sections": cached["sections"],
+               "elapsed": time.perf_counter() - started}
+        return
+
+    first_section_at = None
+    sections = 0
+    report = None
+    for mode, chunk in app.stream(inputs, config, stream_mode=["updates", "messages"]):
+        elapsed = time.perf_counter() - started
+        if mode == "messages":
+            message, metadata = chunk
+            # Structured-output calls stream tool-call chunks with empty content; skip those
+            if metadata.get("langgraph_node") == "worker" and isinstance(message, AIMessageChunk) \
+                    and isinstance(message.content, str) and message.content:
+                # Workers run in parallel; `task` tells their interleaved tokens apart
+                yield {"event": "token", "text": message.content,
+                       "task": metadata.get("langgraph_checkpoint_ns"), "elapsed": elapsed}
+            continue
+        for node, update in chunk.items():
+            if not update:
+                continue
+            if node == "orchestrator":
+                decision = update.get("search_decision")
+                yield {"event": "decision", "search_type": getattr(decision, "search_type", None),
+                       "query_term": getattr(decision, "query_term", None), "elapsed": elapsed}
+                yield {"event": "headlines", "headlines": update.get("headlines", []), "elapsed": elapsed}
+            if node in ("orchestrator", "worker"):
+                for section in update.get("completed_sections", []):
+                    sections += 1
+                    if first_section_at is None:
+                        first_section_at = elapsed
+                    yield {"event": "section", "index": sections, "section": _text(section),
+                           "precomputed": node == "orchestrator", "elapsed": elapsed}
+            elif node == "synthesizer":
+                report = _text(update["messages"])
+                yield {"event": "report", "report": report, "cached": False,
+                       "time_to_first_section": first_section_at, "sections": sections, "elapsed": elapsed}
+    if report is not None:
+        response_cache.set(key, version, {"report": report, "sections": sections})
@@ -1,20 +1,124 @@
 import os
-from google.cloud import bigquery
+import threading
+import time
 import json
+from common import backends
+from common.metrics import metrics, record_bigquery_job
+from common.data_io import NEWS_PATH, EMBEDDINGS_DIR
+from .search_index import MIN_ENTITY_SALIENCE, NewsIndex, keywords
+from .embedding_index import EmbeddingIndex
+from .queries import NEWS_BY_CATEGORY, NEWS_BY_KEYWORDS, NEWS_BY_SEARCH_TERM, run_query
+
+# The table only changes once per ETL run; older local snapshots defer to BigQuery
+INDEX_MAX_AGE = float(os.environ.get("NEWS_INDEX_MAX_AGE", 24 * 3600))
+# How often table_info() may re-check the table's last-modified time and partitioning
+VERSION_CHECK_INTERVAL = 60
+# A table modified this long after the local snapshot has rows the snapshot lacks (e.g. ingest_daemon.py
+# MERGEs), so queries go to BigQuery; the slack covers the ETL's own load right after it writes news.parquet
+INDEX_TABLE_LAG = float(os.environ.get("NEWS_INDEX_TABLE_LAG", 600))
 
 
 class Bq_tools:
-    def __init__(self):
-        self.PROJECT_ID = os.environ["PROJECT_ID"]           
+    def __init__(self, index_path=NEWS_PATH, embeddings_dir=EMBEDDINGS_DIR):
+        # Construction is free: PROJECT_ID and the BigQuery client are only needed once a query runs
         self.DATASET_ID = "news"
         self.TABLE_ID   = "news_data"
-        self.client = bigquery.Client(project=self.PROJECT_ID)
-        self.table_ref = f"`{self.PROJECT_ID}.{self.DATASET_ID}.{self.TABLE_ID}`"
+        self.index_path = index_path
+        self.index = None
+        self.embeddings_dir = embeddings_dir
+        self.embedding_index = None
+        self.embedding_version = None
+        self._table_info = None
+        self._table_modified = None
+        # Concurrent first queries would otherwise each build their own copy of the index
+        self._index_lock = threading.Lock()
+
+    @property
+    def PROJECT_ID(self):
+        return os.environ["PROJECT_ID"]
+
+    @property
+    def client(self):
+        return backends.get("bigquery")
+
+    @property
+    def table_ref(self):
+        return f"`{self.PROJECT_ID}.{self.DATASET_ID}.{self.TABLE_ID}`"
+
+    def local_index(self):
+        """The in-process NewsIndex if it is fresh, else None (callers then query BigQuery)."""
+        if self.index_path and os.path.exists(self.index_path):
+            modified = os.path.getmtime(self.index_path)
+            # (Re)build whenever the ETL rewrites its output
+            if self.index is None or self.index.source_version != modified:
+                with self._index_lock:
+                    if self.index is None or self.index.source_version != modified:
+                        self.index = NewsIndex.from_parquet(self.index_path)
+        if self.index is None or self.index.is_stale(INDEX_MAX_AGE) or self.table_is_newer(self.index):
+            return None
+        return self.index
+
+    def table_is_newer(self, index):
+        """True once news_data was modified more than INDEX_TABLE_LAG after `index` was captured."""
+        now = time.monotonic()
+        if self._table_modified is None or now - self._table_modified[0] > VERSION_CHECK_INTERVAL:
+            modified = None
+            # Without a project (offline / local-only hosts) the snapshot is all there is
+            if os.environ.get("PROJECT_ID"):
+                try:
+                    modified = self.client.get_table(self.table_ref.strip('`')).modified.timestamp()
+                except Exception as e:
+                    print(f"news_data last-modified check failed: {e}")
+            self._table_modified = (now, modified)
+        modified = self._table_modified[1]
+        return modified is not None and modified - index.snapshot_at > INDEX_TABLE_LAG
+
+    def local_embedding_index(self):
+        """The memory-mapped EmbeddingIndex written by the ETL, reloaded when it changes; None if absent."""
+        vectors_path = os.path.join(self.embeddings_dir, 'vectors.npy')
+        if not os.path.exists(vectors_path):
+            return None
+        version = os.path.getmtime(vectors_path)
+        if self.embedding_index is None or self.embedding_version != version:
+            with self._index_lock:
+                if self.embedding_index is None or self.embedding_version != version:
+                    self.embedding_index = EmbeddingIndex.load(self.embeddings_dir)
+                    self.embedding_version = version
+        return self.embedding_index
+
+    def dataset_version(self):
+        """Identifier of the ETL snapshot being served; changes whenever a new load lands."""
+        index = self.local_index()
+        if index is not None:
+            return f"local:{index.source_version}"
+        return self.table_info()[0]
+
+    def table_info(self):
+        """(version, partitioned by ingested_at?) of news_data, re-read at most every VERSION_CHECK_INTERVAL."""
+        now = time.monotonic()
+        if self._table_info is None or now - self._table_info[0] > VERSION_CHECK_INTERVAL:
+            table = self.client.get_table(self.table_ref.strip('`'))
+            partitioning = getattr(table, "time_partitioning", None)
+            partitioned = getattr(partitioning, "field", None) == "ingested_at"
+            self._table_info = (now, f"table:{table.modified.isoformat()}", partitioned)
+        return self._table_info[1:]
+
+    def run_template(self, template, **params):
+        version, partitioned = self.table_info()
+        return run_query(self.client, template, self.table_ref, version, partitioned, **params)
+
+    def refresh_index_from_table(self):
+        """Build the local index from a snapshot of news_data (for hosts without the ETL output)."""
+        table = self.client.get_table(self.table_ref.strip('`'))
+        df = self.client.query(f"SELECT * FROM {self.table_ref}").to_dataframe()
+        self.index = NewsIndex.from_frame(df, source_version=table.modified, snapshot_at=time.time())
+        self.index_path = None
+        return f"Indexed {len(df)} rows from {self.table_ref}"
 
     def execute_sql_query(self,sql):
-        query_job = self.client.query(sql)           
-        df = query_job.to_dataframe()
-        data=df.to_dict(orient='records')
+        query_job = self.client.query(sql)
+        data=[dict(row.items()) for row in query_job.result()]
+        record_bigquery_job(query_job, "agent_query")
         return data
 
     def get_schema(self):
@@ -29,24 +133,44 @@ class Bq_tools:
         schema=self.execute_sql_query(sql)
         return json.dumps({'project_id':self.PROJECT_ID ,'dataset_id':self.DATASET_ID,'table_id':self.TABLE_ID}) + 'Schema:\n' + json.dumps(schema)
     
+    @metrics.timed("tool.get_news_by_category")
     def get_news_by_category(self,category:str)->str:
-        sql = f"""
-        SELECT
-        headline,extracted_text,sentiment,entities
-        FROM `{self.PROJECT_ID}.{self.DATASET_ID}.{self.TABLE_ID}`
-        where CONTAINS_SUBSTR(detailed_category, '{category}') 
-        OR CONTAINS_SUBSTR(category, '{category}') LIMIT 5
-        """
-        return self.execute_sql_query(sql)
+        index = self.local_index()
+        if index is not None:
+            metrics.incr("retrieval.source", source="index")
+            return index.search_by_category(category)
+        metrics.incr("retrieval.source", source="bigquery")
+        return self.run_template(NEWS_BY_CATEGORY, category=category, limit=5)
     
+    @metrics.timed("tool.get_news_by_search_term")
     def get_news_by_search_term(self,search_term:str)->str:
-        sql = f"""
-        SELECT
-        headline,extracted_text,sentiment,entities
-        FROM `{self.PROJECT_ID}.{self.DATASET_ID}.{self.TABLE_ID}`
-        where CONTAINS_SUBSTR(entities, '{search_term}') 
-         LIMIT 5
-        """
-        return self.execute_sql_query(sql)
+        index = self.local_index()
+        if index is not None:
+            metrics.incr("retrieval.source", source="index")
+            return index.search_by_entity(search_term)
+        metrics.incr("retrieval.source", source="bigquery")
+        return self.run_template(NEWS_BY_SEARCH_TERM, search_term=search_term.strip(),
+                                 min_salience=MIN_ENTITY_SALIENCE, limit=5)
+
+    @metrics.timed("tool.get_news_by_semantic_query")
+    def get_news_by_semantic_query(self,query:str,k:int=5)->str:
+        """Top-k articles by embedding similarity to a free-form question."""
+        index = self.local_embedding_index()
+        if index is not None:
+            metrics.incr("retrieval.source", source="embeddings")
+            return index.search([query], k=k)[0]
+        # No vectors on this host: rank by the question's keywords instead (an entity
+        # lookup would need the whole question to be an entity name and finds nothing)
+        print(f"No embeddings in {self.embeddings_dir}; semantic query falls back to keyword search")
+        metrics.incr("retrieval.semantic_fallback")
+        text_index = self.local_index()
+        if text_index is not None:
+            metrics.incr("retrieval.source", source="index")
+            return text_index.search_by_text(query, limit=k)
+        terms = tuple(keywords(query))
+        if not terms:
+            return []
+        metrics.incr("retrieval.source", source="bigquery")
+        return self.run_template(NEWS_BY_KEYWORDS, keywords=terms, limit=k)
 
 toolkit=Bq_tools()
\ No newline at end of file
@@ -0,0 +1,456 @@
+"""
+Deterministic local stand-ins for every external dependency.
+
+Each fake takes a `Profile` (mean latency, jitter, failure rate, seed), so a
+scenario can reproduce slow or flaky upstreams without the network:
+
+* FakeNewsSite     - aiohttp server with synthetic article pages (HTTP fetch + newspaper parse)
+* FakeSerpApi      - `requests`-like session for data_extractor.extractor
+* FakeNLPClient    - `annotate_text` with language_v1-shaped responses
+* FakeLLM          - chat model stand-in supporting `.with_structured_output`
+* FakeBigQueryClient - in-memory tables emulating the statements the repo issues
+"""
+import asyncio
+import random
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pandas as pd
+import requests
+from aiohttp import web
+from google.api_core import exceptions as google_exceptions
+from google.cloud.exceptions import NotFound
+from langchain_core.runnables import RunnableLambda
+
+from common import backends
+
+WORDS = (
+    "market rally stocks investors growth policy research launch model data chips energy climate "
+    "league season match vote election budget startup funding cloud security study discovery "
+    "film music release quarter earnings report analysts regulators court ruling deal talks"
+).split()
+# (name, language_v1 entity type) woven into the synthetic articles
+ENTITIES = [
+    ("OpenAI", 3), ("Google", 3), ("Nvidia", 3), ("NASA", 3), ("Federal Reserve", 3),
+    ("Elon Musk", 1), ("Taylor Swift", 1), ("Lionel Messi", 1), ("Paris", 2), ("Tokyo", 2),
+    ("Champions League", 4), ("Olympics", 4),
+]
+CATEGORIES = ["/News/Technology", "/Business & Industrial", "/News/Politics", "/Sports", "/Science"]
+
+
+@dataclass
+class Profile:
+    """Latency and failure injection for one fake; sampled from a seeded RNG."""
+    latency: float = 0.0
+    jitter: float = 0.0
+    failure_rate: float = 0.0
+    seed: int = 0
+    _rng: random.Random = field(init=False, repr=False)
+    _lock: threading.Lock = field(init=False, repr=False, default_factory=threading.Lock)
+
+    def __post_init__(self):
+        self._rng = random.Random(self.seed)
+
+    def sample(self):
+        """(delay seconds, whether this call fails)."""
+        with self._lock:
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            return delay, self._rng.random() < self.failure_rate
+
+
+def article_body(n, paragraphs=8, duplicate_every=10):
+    """
+    Synthetic article text for page `n`. Every `duplicate_every`-th page
+    republishes the previous page's body, like a syndicated wire story.
+    """
+    if duplicate_every and n % duplicate_every == duplicate_every - 1:
+        n -= 1
+    rng = random.Random(n)
+    entities = rng.sample(ENTITIES, 3)
+    lines = []
+    for p in range(paragraphs):
+        # Real-looking sentences: newspaper scores paragraphs by their stopword density
+        sentences = []
+        for s in range(4):
+            w = [rng.choice(WORDS) for _ in range(6)]
+            subject = entities[(p + s) % 3][0] if s % 2 == 0 else f"the {w[5]}"
+            sentences.append(f"The {w[0]} of the {w[1]} was {w[2]} after {subject} said that the {w[3]} and {w[4]} would be in focus this week.")
+        lines.append(" ".join(sentences))
+    return lines
+
+
+def article_html(n, paragraphs=8, duplicate_every=10, boilerplate=0):
+    """An article page; `boilerplate` adds that many nav/sidebar/script blocks, as real news pages carry."""
+    lines = article_body(n, paragraphs, duplicate_every)
+    body = "".join(f"<p>{line}</p>" for line in lines)
+    chrome = "".join(
+        f'<nav><ul>{"".join(f"<li><a href=/section/{i}/{j}>Section {j}</a></li>" for j in range(12))}</ul></nav>'
+        f'<aside><div class="promo">Related story {i}</div></aside>'
+        f'<script>window.dataLayer = window.dataLayer || []; dataLayer.push({{"slot": {i}}});</script>'
+        for i in range(boilerplate)
+    )
+    return (f"<html><head><title>Headline {n}</title></head><body>{chrome}"
+            f"<article><h1>Headline {n}</h1>{body}</article>{chrome}</body></html>")
+
+
+class FakeNewsSite:
+    """Local HTTP server for /news/<n>; injected failures answer 503 (which the fetcher retries)."""
+
+    def __init__(self, profile=None, paragraphs=8, duplicate_every=10):
+        self.profile = profile or Profile()
+        self.paragraphs = paragraphs
+        self.duplicate_every = duplicate_every
+        self.base_url = None
+        self.requests = 0
+        self._loop = None
+        self._runner = None
+        self._thread = None
+
+    async def _handle(self, request):
+        self.requests += 1
+        delay, fail = self.profile.sample()
+        if delay:
+            await asyncio.sleep(delay)
+        if fail:
+            return web.Response(status=503)
+        n = int(request.match_info["n"])
+        return web.Response(text=article_html(n, self.paragraphs, self.duplicate_every), content_type="text/html")
+
+    def start(self):
+        ready = threading.Event()
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            app = web.Application()
+            app.router.add_get("/news/{n}", self._handle)
+            self._runner = web.AppRunner(app, access_log=None)
+            self._loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, "127.0.0.1", 0, backlog=1024)
+            self._loop.run_until_complete(site.start())
+            port = self._runner.addresses[0][1]
+            self.base_url = f"http://127.0.0.1:{port}"
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, name="fake-news-site", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def url(self, n):
+        return f"{self.base_url}/news/{n}"
+
+    def stop(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+
+class _SerpResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self._payload = payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} from fake SerpApi")
+
+    def json(self):
+        return self._payload
+
+
+class FakeSerpApi:
+    """`session.get(...)` stand-in returning `per_query` results per query, linked to `site`."""
+
+    def __init__(self, site, per_query=20, profile=None):
+        self.site = site
+        self.per_query = per_query
+        self.profile = profile or Profile()
+        self.calls = 0
+        self._offsets = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, timeout=None):
+        delay, fail = self.profile.sample()
+        time.sleep(delay)
+        with self._lock:
+            self.calls += 1
+            # Each query gets its own contiguous block of page numbers
+            offset = self._offsets.setdefault(params["q"], len(self._offsets) * self.per_query)
+        if fail:
+            return _SerpResponse(429, {})
+        start, num = int(params.get("start", 0)), int(params.get("num", 10))
+        stop = min(start + num, self.per_query)
+        results = [{"title": f"Headline {offset + i}", "link": self.site.url(offset + i)} for i in range(start, stop)]
+        return _SerpResponse(200, {"news_results": results})
+
+
+class FakeNLPClient:
+    """`annotate_text` stand-in: entities are the known names found in the text; 429s when failing."""
+
+    def __init__(self, profile=None):
+        self.profile = profile or Profile()
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def annotate_text(self, request):
+        delay, fail = self.profile.sample()
+        time.sleep(delay)
+        with self._lock:
+            self.calls += 1
+        if fail:
+            raise google_exceptions.TooManyRequests("fake quota exceeded")
+        text = request["document"]["content"]
+        digest = zlib.crc32(text.encode("utf-8"))
+        found = [(name, kind, text.count(name)) for name, kind in ENTITIES if name in text]
+        total = sum(count for _, _, count in found) or 1
+        return SimpleNamespace(
+            document_sentiment=SimpleNamespace(score=round((digest % 200) / 100 - 1, 2), magnitude=round(digest % 50 / 10, 1)),
+            entities=[SimpleNamespace(name=name, type_=kind, salience=round(count / total, 3)) for name, kind, count in found],
+            categories=[SimpleNamespace(name=CATEGORIES[digest % len(CATEGORIES)], confidence=0.8)],
+        )
+
+
+class FakeLLM:
+    """
+    Gemini stand-in for the structured-output chains. The decision picks the
+    first known entity in the question (keyword search); summaries echo the
+    article's first line. Failures raise ResourceExhausted (429).
+    """
+
+    def __init__(self, profile=None):
+        self.profile = profile or Profile()
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def with_structured_output(self, schema):
+        def respond(prompt_value):
+            delay, fail = self.profile.sample()
+            time.sleep(delay)
+            with self._lock:
+                self.calls += 1
+            if fail:
+                raise google_exceptions.ResourceExhausted("429 RESOURCE_EXHAUSTED (fake)")
+            text = prompt_value.to_messages()[-1].content
+            if "search_type" in schema.model_fields:
+                term = next((name for name, _ in ENTITIES if name.lower() in text.lower()), text.split()[-1])
+                return schema(search_type="by_search_term", query_term=term)
+            lines = text.split("\n")
+            return schema(heading=lines[0][:80], summary=" ".join(lines[1:])[:400])
+        return RunnableLambda(respond)
+
+
+class _QueryJob:
+    def __init__(self, rows, bytes_processed=0):
+        self._rows = rows
+        self.total_bytes_processed = bytes_processed
+        self.total_bytes_billed = bytes_processed
+
+    def result(self):
+        return self._rows
+
+    def to_dataframe(self):
+        return pd.DataFrame(self._rows)
+
+
+class _LoadJob:
+    def __init__(self, rows):
+        self.output_rows = rows
+        self.errors = None
+
+    def result(self):
+        return self
+
+
+CONTAINS_RE = re.compile(r"CONTAINS_SUBSTR\((\w+),\s*'([^']*)'\)")
+
+
+class FakeBigQueryClient:
+    """
+    In-memory BigQuery: datasets/tables plus the statements data_insert.py and
+    tools.py issue (existing-hash lookup, watermark check, staged MERGE and the
+    CONTAINS_SUBSTR retrieval queries). Bytes processed are estimated from the
+    string size of the scanned columns.
+    """
+
+    def __init__(self, profile=None):
+        self.profile = profile or Profile()
+        self.tables = {}
+        self.datasets = set()
+        self.queries = 0
+        self._lock = threading.RLock()
+
+    def _delay(self):
+        delay, fail = self.profile.sample()
+        time.sleep(delay)
+        if fail:
+            raise google_exceptions.ServiceUnavailable("fake BigQuery unavailable")
+
+    @staticmethod
+    def _name(ref):
+        return str(getattr(ref, "table_id", ref)).strip("`").split(".")[-1]
+
+    def get_dataset(self, ref):
+        if str(ref) not in self.datasets:
+            raise NotFound(f"Dataset {ref}")
+        return SimpleNamespace(dataset_id=str(ref))
+
+    def create_dataset(self, dataset, timeout=None, exists_ok=False):
+        self.datasets.add(f"{dataset.project}.{dataset.dataset_id}")
+        return dataset
+
+    def get_table(self, ref):
+        with self._lock:
+            table = self.tables.get(self._name(ref))
+            if table is None:
+                raise NotFound(f"Table {ref}")
+            return SimpleNamespace(schema=table["schema"], num_rows=len(table["rows"]), modified=table["modified"],
+                                   time_partitioning=table.get("time_partitioning"))
+
+    def create_table(self, table, exists_ok=False):
+        with self._lock:
+            self.tables.setdefault(self._name(table.table_id), {
+                "schema": list(table.schema), "rows": {}, "modified": datetime.now(timezone.utc),
+                "time_partitioning": getattr(table, "time_partitioning", None)})
+        return table
+
+    def update_table(self, table, fields):
+        return table
+
+    def delete_table(self, ref, not_found_ok=False):
+        with self._lock:
+            self.tables.pop(self._name(ref), None)
+
+    def load_table_from_dataframe(self, df, ref, job_config=None):
+        self._delay()
+        with self._lock:
+            self.tables[self._name(ref)] = {"schema": [], "rows": {i: row for i, row in enumerate(df.to_dict(orient="records"))},
+                                            "modified": datetime.now(timezone.utc)}
+        return _LoadJob(len(df))
+
+    def load_table_from_file(self, source, ref, job_config=None):
+        df = pd.read_parquet(source) if str(getattr(job_config, "source_format", "")).endswith("PARQUET") else pd.read_csv(source)
+        return self.load_table_from_dataframe(df, ref, job_config)
+
+    def query(self, sql, job_config=None):
+        self._delay()
+        with self._lock:
+            self.queries += 1
+            params = {p.name: getattr(p, "values", getattr(p, "value", None))
+                      for p in getattr(job_config, "query_parameters", None) or []}
+            if "MERGE" in sql:
+                return self._merge(sql, params)
+            if "COUNT(*) AS loaded" in sql:
+                table = self._table_in(sql)
+                loaded = sum(1 for row in table["rows"].values() if row.get("batch_id") == params["batch_id"])
+                return _QueryJob([{"loaded": loaded}])
+            table = self._table_in(sql)
+            rows = list(table["rows"].values())
+            if "SELECT url, content_hash" in sql:
+                urls = set(params["urls"])
+                return _QueryJob([{"url": r["url"], "content_hash": r.get("content_hash")} for r in rows if r["url"] in urls],
+                                 self._bytes(rows, ["url", "content_hash"]))
+            job = self._select(sql, params, rows)
+            limit = getattr(job_config, "maximum_bytes_billed", None)
+            if limit and job.total_bytes_billed > limit:
+                raise google_exceptions.BadRequest(
+                    f"Query exceeded limit for bytes billed: {limit}. {job.total_bytes_billed} or higher required.")
+            return job
+
+    def _table_in(self, sql):
+        refs = re.findall(r"`([^`]+)`", sql)
+        for ref in refs:
+            if self._name(ref) in self.tables:
+                return self.tables[self._name(ref)]
+        return {"rows": {}}
+
+    @staticmethod
+    def _bytes(rows, columns):
+        return sum(len(str(row.get(column, ""))) for row in rows for column in columns)
+
+    def _merge(self, sql, params):
+        target_ref, staging_ref, watermark_ref = re.findall(r"`([^`]+)`", sql)[:3]
+        target = self.tables[self._name(target_ref)]
+        staging = self.tables.get(self._name(staging_ref), {"rows": {}})
+        now = datetime.now(timezone.utc)
+        for row in staging["rows"].values():
+            stored = target["rows"].get(row["url"])
+            if stored is None or stored.get("content_hash") != row.get("content_hash"):
+                target["rows"][row["url"]] = dict(row, ingested_at=now)
+        target["modified"] = now
+        watermarks = self.tables[self._name(watermark_ref)]
+        watermarks["rows"][params["batch_id"]] = {"batch_id": params["batch_id"], "row_count": params["row_count"], "loaded_at": now}
+        return _QueryJob([], self._bytes(list(staging["rows"].values()), ["url", "content_hash"]))
+
+    def _select(self, sql, params, rows):
+        """
+        Retrieval queries: OR of CONTAINS_SUBSTR / `@param IN UNNEST(column)` filters
+        (literal or @param), the ingested_at look-back filter, one row per cluster, LIMIT.
+        """
+        filters = [(column, value.lower()) for column, value in CONTAINS_RE.findall(sql)]
+        for column, name in re.findall(r"CONTAINS_SUBSTR\((\w+),\s*@(\w+)\)", sql):
+            filters.append((column, str(params[name]).lower()))
+        members = [(column, params[name]) for name, column in re.findall(r"@(\w+)\s+IN\s+UNNEST\((\w+)\)", sql)]
+        entity = re.search(r"LOWER\(e\.name\) = LOWER\(@(\w+)\) AND e\.salience >= @(\w+)", sql)
+        if entity:
+            # EXISTS(SELECT 1 FROM UNNEST(entities) AS e WHERE ...): exact name above a salience threshold
+            name, min_salience = str(params[entity.group(1)]).lower(), params[entity.group(2)]
+            rows = [row for row in rows
+                    if any(e["name"].lower() == name and e["salience"] >= min_salience for e in row.get("entities") or [])]
+        keyword = re.search(r"UNNEST\(@(\w+)\) AS k WHERE CONTAINS_SUBSTR\(headline, k\) OR CONTAINS_SUBSTR\(extracted_text, k\)", sql)
+        if keyword:
+            # Rows mentioning any keyword, most keywords first
+            terms = [str(term).lower() for term in params[keyword.group(1)]]
+            hits = [(sum(term in f"{row.get('headline', '')} {row.get('extracted_text', '')}".lower() for term in terms), row)
+                    for row in rows]
+            rows = [row for count, row in sorted(hits, key=lambda hit: -hit[0]) if count]
+        lookback = re.search(r"INTERVAL\s+@(\w+)\s+DAY", sql)
+        if lookback:
+            # Partition pruning: only rows ingested inside the window are scanned at all
+            cutoff = datetime.now(timezone.utc).timestamp() - params[lookback.group(1)] * 86400
+            rows = [row for row in rows if row.get("ingested_at") is not None
+                    and pd.Timestamp(row["ingested_at"]).timestamp() >= cutoff]
+        matched, clusters = [], set()
+        for row in rows:
+            if (filters or members) and not (
+                    any(value in str(row.get(column, "")).lower() for column, value in filters)
+                    or any(value in list(row.get(column) or []) for column, value in members)):
+                continue
+            cluster = row.get("cluster_id") or row.get("url")
+            if cluster in clusters:
+                continue
+            clusters.add(cluster)
+            matched.append(row)
+        limit = re.search(r"LIMIT\s+(\d+|@\w+)", sql)
+        if limit:
+            value = limit.group(1)
+            matched = matched[:int(params[value[1:]] if value.startswith("@") else value)]
+        columns = [column.strip() for column in re.search(r"SELECT\s+(.*?)\s+FROM", sql, re.S).group(1).split(",")]
+        if columns != ["*"]:
+            matched = [{column: row.get(column) for column in columns} for row in matched]
+        scanned = [column for column, _ in filters] + (["entities"] if entity else []) + (
+            ["headline", "extracted_text"] if keyword else [])
+        return _QueryJob(matched, self._bytes(rows, scanned or ["url"]))
+
+
+def install(nlp=None, llm=None, bigquery=None):
+    """Point the repo's backend registry at the given fakes (fresh defaults when omitted)."""
+    fakes = {
+        "language": nlp or FakeNLPClient(),
+        "llm": llm or FakeLLM(),
+        "bigquery": bigquery or FakeBigQueryClient(),
+    }
+    for name, instance in fakes.items():
+        backends.override(name, instance)
+    backends.override("precise_llm", fakes["llm"])
+    # Rebuild the chains on top of the fake LLM
+    backends.reset("decision_chain")
+    backends.reset("news_summarizer_chain")
+    return fakes
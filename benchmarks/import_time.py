@@ -0,0 +1,88 @@
+"""
+Cold-start guard: import each entry point in a fresh interpreter, without
+credentials, and fail if it gets slower than its budget or loads a heavy
+client SDK eagerly. The modules are the ones ETL.py, ingest_daemon.py and
+the agent actually import, not just the lazy package stubs.
+
+    python -m benchmarks.import_time [--runs 5] [--scale 1.0]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# module -> median import budget in seconds: about 1.5x the median measured on a single-core
+# CI box, so a 2x cold-start regression fails. Re-measure and tighten when imports get faster.
+BUDGETS = {
+    "preprocessor": 0.05,
+    "preprocessor.preprocess_data": 1.4,
+    "preprocessor.streaming": 1.4,
+    "data_extractor": 1.0,
+    "agents": 2.5,
+    "ETL": 1.5,
+    "ingest_daemon": 1.5,
+}
+# Clients and SDKs that must only be loaded on first use
+DEFERRED_MODULES = [
+    "langchain_google_genai",
+    "google.cloud.bigquery",
+    "google.cloud.language_v1",
+    "newspaper",
+]
+CREDENTIAL_VARS = ["PROJECT_ID", "GOOGLE_API_KEY", "GOOGLE_APPLICATION_CREDENTIALS", "SERPAPI_api_key"]
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {deferred!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, runs):
+    env = {key: value for key, value in os.environ.items() if key not in CREDENTIAL_VARS}
+    env["PYTHONPATH"] = REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    samples, loaded = [], set()
+    for _ in range(runs):
+        # Run outside the repo so CWD-relative file access would fail loudly
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, deferred=DEFERRED_MODULES)],
+            env=env, cwd=os.path.dirname(REPO_ROOT) or "/", capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        samples.append(result["seconds"])
+        loaded.update(result["loaded"])
+    return statistics.median(samples), sorted(loaded)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget (slow machines)")
+    args = parser.parse_args(argv)
+
+    failures = []
+    for module, budget in BUDGETS.items():
+        try:
+            seconds, loaded = measure(module, args.runs)
+        except subprocess.CalledProcessError as e:
+            failures.append(f"{module}: import failed without credentials\n{e.stderr}")
+            continue
+        limit = budget * args.scale
+        print(f"{module:<30} median {seconds * 1000:8.1f} ms  budget {limit * 1000:8.1f} ms  eager: {loaded or '-'}")
+        if seconds > limit:
+            failures.append(f"{module}: {seconds:.2f}s exceeds the {limit:.2f}s budget")
+        if loaded:
+            failures.append(f"{module}: eagerly imports {', '.join(loaded)}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+Run benchmark scenarios offline and compare them with stored baselines.
+
+    python -m benchmarks.run                          # default scenarios vs baselines.json
+    python -m benchmarks.run -s etl_10k,agent_32      # pick scenarios (see scenarios.SCENARIOS)
+    python -m benchmarks.run --update-baseline        # record the current numbers
+    python -m benchmarks.run --output report.json     # keep the full report
+
+Each scenario runs in a fresh interpreter so peak memory is per scenario.
+Exits 1 when throughput drops, or p99 latency / peak memory grow, by more
+than --tolerance relative to the baseline.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+# metric -> True when bigger is better
+COMPARED = {"throughput": True, "p99": False, "peak_rss_mb": False}
+
+
+def tree_rss_mb(pid=None):
+    """Current RSS of `pid` (default: this process) plus all its descendants, from /proc; None elsewhere."""
+    pid = pid or os.getpid()
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            total = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        children = []
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        return None
+    return total / (1024 * 1024) + sum(tree_rss_mb(child) or 0.0 for child in children)
+
+
+class TreeRssSampler:
+    """Peak of tree_rss_mb() while running, so worker processes (parse pool, forkserver) count too."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, tree_rss_mb() or 0.0)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_worker(name):
+    """Child process: run one scenario and print its summary as JSON."""
+    import logging
+    from preprocessor.streaming import peak_rss_mb
+    from .scenarios import SCENARIOS
+
+    logging.disable(logging.WARNING)
+    with TreeRssSampler() as sampler:
+        raw = SCENARIOS[name]()
+    latencies = np.array(raw["latencies"] or [raw["seconds"]])
+    summary = {
+        "scenario": name,
+        "items": raw["items"],
+        "seconds": round(raw["seconds"], 3),
+        "throughput": round(raw["items"] / raw["seconds"], 3),
+        "p50": round(float(np.percentile(latencies, 50)), 4),
+        "p99": round(float(np.percentile(latencies, 99)), 4),
+        # This interpreter and its worker processes together
+        "peak_rss_mb": round(max(sampler.peak, peak_rss_mb(include_children=True)), 1),
+        "counters": raw["counters"],
+    }
+    print("BENCHMARK " + json.dumps(summary))
+
+
+def run_scenario(name):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    # The pipeline prints per article; only the summary line matters here
+    completed = subprocess.run([sys.executable, "-m", "benchmarks.run", "--worker", name],
+                               cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    for line in completed.stdout.splitlines():
+        if line.startswith("BENCHMARK "):
+            return json.loads(line[len("BENCHMARK "):])
+    raise RuntimeError(f"scenario {name} failed:\n{completed.stderr[-4000:]}")
+
+
+def compare(result, baseline, tolerance):
+    """[(metric, baseline, current, relative change, regressed)] for the compared metrics."""
+    rows = []
+    for metric, higher_is_better in COMPARED.items():
+        if metric not in baseline or not baseline[metric]:
+            continue
+        change = (result[metric] - baseline[metric]) / baseline[metric]
+        regressed = change < -tolerance if higher_is_better else change > tolerance
+        rows.append((metric, baseline[metric], result[metric], change, regressed))
+    return rows
+
+
+def main(argv=None):
+    from .scenarios import DEFAULT_SCENARIOS, SCENARIOS
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-s", "--scenarios", default=",".join(DEFAULT_SCENARIOS),
+                        help=f"comma-separated, from: {', '.join(SCENARIOS)}")
+    parser.add_argument("--baseline", default=BASELINES_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args.worker)
+        return 0
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+
+    results, regressions = {}, []
+    print(f"{'scenario':<20} {'items':>7} {'seconds':>9} {'items/s':>9} {'p50 s':>8} {'p99 s':>8} {'peak MB':>8}")
+    for name in args.scenarios.split(","):
+        result = results[name] = run_scenario(name)
+        print(f"{name:<20} {result['items']:>7} {result['seconds']:>9.2f} {result['throughput']:>9.2f} "
+              f"{result['p50']:>8.3f} {result['p99']:>8.3f} {result['peak_rss_mb']:>8.1f}")
+        if name not in baselines:
+            # Nothing to compare against, so this scenario can never report a regression
+            print("    no baseline; record one with --update-baseline")
+        for metric, before, after, change, regressed in compare(result, baselines.get(name, {}), args.tolerance):
+            marker = "REGRESSION" if regressed else "ok"
+            print(f"    {metric:<12} baseline {before:>10.3f} -> {after:>10.3f} ({change:+.1%}) {marker}")
+            if regressed:
+                regressions.append(f"{name}.{metric}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.update_baseline:
+        for name, result in results.items():
+            baselines[name] = {key: result[key] for key in ("items", "throughput", "p50", "p99", "peak_rss_mb")}
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baselines written to {args.baseline}")
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
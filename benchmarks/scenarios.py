@@ -0,0 +1,182 @@
+"""
+Benchmark scenarios. Each one builds its own fakes, runs a slice of the real
+code against them and returns raw samples:
+
+    {"items": n, "seconds": wall, "latencies": [...], "counters": {...}}
+
+`benchmarks.run` turns these into throughput / p50 / p99 / peak memory.
+"""
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from types import SimpleNamespace
+
+import pandas as pd
+
+from common.data_io import NEWS_SCHEMA, write_frame
+from common.metrics import metrics
+from . import fakes
+
+# Latency of each fake upstream in the default scenarios (seconds); roughly what production sees
+SITE_PROFILE = dict(latency=0.05, jitter=0.04, failure_rate=0.02)
+SERPAPI_PROFILE = dict(latency=0.3, jitter=0.1)
+NLP_PROFILE = dict(latency=0.08, jitter=0.05, failure_rate=0.01)
+LLM_PROFILE = dict(latency=0.4, jitter=0.2)
+BIGQUERY_PROFILE = dict(latency=0.2, jitter=0.05)
+
+
+def _counters():
+    return {f"{entry['name']}{entry['labels'] or ''}": entry["value"] for entry in metrics.snapshot()["counters"]}
+
+
+class _TimedSink:
+    """Wraps a sink and records the time taken to produce each chunk (the ETL's per-chunk latency)."""
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.latencies = []
+        self._last = time.perf_counter()
+
+    def write(self, df):
+        self.sink.write(df)
+        now = time.perf_counter()
+        self.latencies.append(now - self._last)
+        self._last = now
+
+    def close(self):
+        return self.sink.close()
+
+
+def etl(n_urls, chunk_size=500, nlp_workers=8, parse_workers=4, seed=0):
+    """SerpApi -> fetch -> parse -> dedup -> NLP -> incremental BigQuery MERGE, streamed in chunks."""
+    from data_extractor.extractor import category_queries, iter_news
+    from preprocessor.html_extract import HtmlExtractor
+    from preprocessor.preprocess_data import GCPContentPreprocessor
+    from preprocessor.streaming import BigQuerySink, run_streaming_etl
+
+    os.environ.setdefault("PROJECT_ID", "benchmark")
+    os.environ.setdefault("SERPAPI_api_key", "benchmark")
+    site = fakes.FakeNewsSite(fakes.Profile(seed=seed, **SITE_PROFILE)).start()
+    per_query = math.ceil(n_urls / len(category_queries))
+    serpapi = fakes.FakeSerpApi(site, per_query=per_query, profile=fakes.Profile(seed=seed, **SERPAPI_PROFILE))
+    installed = fakes.install(nlp=fakes.FakeNLPClient(fakes.Profile(seed=seed, **NLP_PROFILE)),
+                              bigquery=fakes.FakeBigQueryClient(fakes.Profile(seed=seed, **BIGQUERY_PROFILE)))
+    sink = _TimedSink(BigQuerySink(client=installed["bigquery"]))
+    records = iter_news(max_pages=math.ceil(per_query / 100), page_size=min(per_query, 100),
+                        session=serpapi, requests_per_second=50)
+    extractor = HtmlExtractor()
+    started = time.perf_counter()
+    try:
+        run_streaming_etl(records, sink, chunk_size=chunk_size,
+                          preprocess_object=GCPContentPreprocessor(nlp_client=installed["language"], extractor=extractor),
+                          nlp_workers=nlp_workers, parse_workers=parse_workers,
+                          embeddings_dir=tempfile.mkdtemp(prefix="news-bench-"))
+    finally:
+        extractor.close()
+        site.stop()
+    counters = dict(_counters(), nlp_calls=installed["language"].calls)
+    # per_query is rounded up, so count what the collector actually yielded
+    return {"items": int(counters.get("collect.articles", n_urls)), "seconds": time.perf_counter() - started,
+            "latencies": sink.latencies, "counters": counters}
+
+
+# Pages in flight at once in html_extraction, whichever backend parses them
+EXTRACT_CLIENTS = 8
+
+
+def html_extraction(n_pages=200, processes=True, boilerplate=40, clients=EXTRACT_CLIENTS):
+    """Parse a fixed corpus of article pages, in the process pool or in threads as the pipeline used to."""
+    from preprocessor.html_extract import HtmlExtractor, available_cores
+
+    corpus = [(f"https://example.com/news/{n}", fakes.article_html(n, boilerplate=boilerplate)) for n in range(n_pages)]
+    # Four parse threads was run_pipeline's default before the process pool
+    extractor = HtmlExtractor(processes=processes) if processes else HtmlExtractor(max_workers=4, processes=False)
+
+    def parse(page):
+        started = time.perf_counter()
+        extractor.extract(*page)
+        return time.perf_counter() - started
+
+    with extractor:
+        extractor.extract(*corpus[0])  # start (and warm up) the workers outside the timed run
+        started = time.perf_counter()
+        # The same offered load for both backends, so only the parser differs between the runs
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            latencies = list(executor.map(parse, corpus))
+        seconds = time.perf_counter() - started
+    return {"items": n_pages, "seconds": seconds, "latencies": latencies,
+            "counters": {"workers": extractor.max_workers, "clients": clients, "cores": available_cores(),
+                         "html_bytes": sum(len(html) for _, html in corpus)}}
+
+
+def synthetic_news(n_articles):
+    """A news.parquet-shaped frame built from the fake site's corpus, with precomputed entities."""
+    from preprocessor.preprocess_data import GCPContentPreprocessor
+
+    preprocessor = GCPContentPreprocessor(nlp_client=fakes.FakeNLPClient())
+    rows = []
+    for n in range(n_articles):
+        text = "\n".join(fakes.article_body(n))
+        rows.append({
+            "category": "AI", "headline": f"Headline {n}", "url": f"https://example.com/news/{n}",
+            "categories": ["AI"], "extracted_text": text, "cluster_id": f"c{n - (n % 10 == 9)}",
+            **preprocessor.analyze_text_content(text),
+        })
+    return pd.DataFrame(rows)
+
+
+def agent_queries(n_queries, concurrency, n_articles=2000, retrieval="index", seed=0):
+    """`n_queries` questions through the agent graph from `concurrency` threads at once."""
+    os.environ.setdefault("PROJECT_ID", "benchmark")
+    installed = fakes.install(llm=fakes.FakeLLM(fakes.Profile(seed=seed, **LLM_PROFILE)),
+                              bigquery=fakes.FakeBigQueryClient(fakes.Profile(seed=seed, **BIGQUERY_PROFILE)))
+    from agents.graph import graph
+    from agents.tools import toolkit
+    from agents import cache
+
+    news = synthetic_news(n_articles)
+    workdir = tempfile.mkdtemp(prefix="news-bench-")
+    if retrieval == "index":
+        toolkit.index_path = write_frame(news, os.path.join(workdir, "news.parquet"), NEWS_SCHEMA)
+    else:
+        toolkit.index_path = None
+        now = pd.Timestamp.now(tz="UTC")
+        installed["bigquery"].tables["news_data"] = {
+            "schema": [], "modified": now, "time_partitioning": SimpleNamespace(field="ingested_at"),
+            "rows": {row["url"]: dict(row, ingested_at=now) for row in news.to_dict(orient="records")},
+        }
+    toolkit.embeddings_dir = workdir
+    for level in (cache.decision_cache, cache.retrieval_cache, cache.summary_cache, cache.query_cache):
+        level.clear()
+
+    names = [name for name, _ in fakes.ENTITIES]
+    questions = [f"What is the latest news about {names[i % len(names)]}? ({i})" for i in range(n_queries)]
+
+    def ask(question):
+        started = time.perf_counter()
+        graph.invoke({"messages": [question]})
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(ask, questions))
+    return {"items": n_queries, "seconds": time.perf_counter() - started, "latencies": latencies,
+            "counters": dict(_counters(), llm_calls=installed["llm"].calls)}
+
+
+SCENARIOS = {
+    "etl_100": partial(etl, 100, chunk_size=50),
+    "etl_10k": partial(etl, 10_000),
+    "etl_100k": partial(etl, 100_000, chunk_size=2000),
+    "extract_threads": partial(html_extraction, processes=False),
+    "extract_processes": partial(html_extraction, processes=True),
+    "agent_1": partial(agent_queries, 12, 1),
+    "agent_8": partial(agent_queries, 48, 8),
+    "agent_32": partial(agent_queries, 128, 32),
+    "agent_32_bigquery": partial(agent_queries, 128, 32, retrieval="bigquery"),
+}
+# Quick enough for every change; the large scenarios are opt-in
+DEFAULT_SCENARIOS = ["etl_100", "extract_threads", "extract_processes", "agent_1", "agent_8", "agent_32"]
@@ -0,0 +1,61 @@
+import os
+import threading
+
+# name -> zero-argument factory; clients are only built on first use
+_factories = {}
+_instances = {}
+# Injected instances win over factories, even ones registered after the override
+_overrides = {}
+_lock = threading.RLock()
+
+
+def register(name, factory):
+    """Register (or replace) the factory for backend `name`, dropping any instance it already built."""
+    with _lock:
+        _factories[name] = factory
+        _instances.pop(name, None)
+
+
+def override(name, instance):
+    """Inject a ready-made backend, e.g. a fake LLM or BigQuery client in tests and benchmarks."""
+    with _lock:
+        _overrides[name] = instance
+
+
+def get(name):
+    """The cached backend `name`, built by its factory on first use."""
+    if name in _overrides:
+        return _overrides[name]
+    with _lock:
+        if name in _overrides:
+            return _overrides[name]
+        if name not in _instances:
+            if name not in _factories:
+                raise KeyError(f"No backend registered as {name!r}")
+            _instances[name] = _factories[name]()
+        return _instances[name]
+
+
+def reset(name=None):
+    """Forget built or injected instances (all of them by default) so the factories run again."""
+    with _lock:
+        if name is None:
+            _instances.clear()
+            _overrides.clear()
+        else:
+            _instances.pop(name, None)
+            _overrides.pop(name, None)
+
+
+def _bigquery_client():
+    from google.cloud import bigquery
+    return bigquery.Client(project=os.environ["PROJECT_ID"])
+
+
+def _language_client():
+    from google.cloud import language_v1
+    return language_v1.LanguageServiceClient()
+
+
+register("bigquery", _bigquery_client)
+register("language", _language_client)
@@ -0,0 +1,148 @@
+import ast
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Stage hand-off files. Parquet keeps multiline article bodies intact and
+# is far cheaper to parse than quoted CSV.
+RAW_NEWS_PATH = './data/raw_news.parquet'
+PREPROCESSED_NEWS_PATH = './data/preprocessed_news.parquet'
+NEWS_PATH = './data/news.parquet'
+# Article vectors for semantic retrieval: vectors.npy (float32, row-aligned with rows.parquet) + info.json
+EMBEDDINGS_DIR = './data/embeddings'
+# Precomputed summaries older than this (seconds) are regenerated by the ETL and skipped by the agent
+SUMMARY_MAX_AGE = float(os.environ.get("SUMMARY_MAX_AGE", 7 * 24 * 3600))
+
+RAW_NEWS_SCHEMA = pa.schema([
+    ('category', pa.string()),
+    ('headline', pa.string()),
+    ('url', pa.string()),
+    ('categories', pa.list_(pa.string())),  # every category the URL was found under
+])
+
+# One Cloud NLP entity; type is the Entity.Type name, e.g. "PERSON"
+ENTITY_STRUCT = pa.struct([
+    ('name', pa.string()),
+    ('type', pa.string()),
+    ('salience', pa.float64()),
+])
+
+PREPROCESSED_NEWS_SCHEMA = pa.schema([
+    ('url', pa.string()),
+    ('extracted_text', pa.string()),
+    ('sentiment_score', pa.float64()),
+    ('sentiment_magnitude', pa.float64()),
+    ('entities', pa.list_(ENTITY_STRUCT)),  # main entities, most salient first
+    ('detailed_category', pa.string()),  # top Cloud NLP category, e.g. "/Science/Computer Science"
+    ('category_confidence', pa.float64()),
+    ('cluster_id', pa.string()),  # near-duplicate cluster (syndicated copies share one id)
+    ('error', pa.string()),  # why the article is unusable; null for good rows
+])
+
+# Filled by the optional summary precomputation stage; null until then
+SUMMARY_SCHEMA = pa.schema([
+    ('heading', pa.string()),
+    ('summary', pa.string()),
+    ('summarized_at', pa.timestamp('us', tz='UTC')),
+])
+
+NEWS_SCHEMA = pa.schema(list(RAW_NEWS_SCHEMA)
+                        + [field for field in PREPROCESSED_NEWS_SCHEMA if field.name not in ('url', 'error')]
+                        + list(SUMMARY_SCHEMA))
+
+# List columns; CSV debug exports store them as JSON arrays
+CSV_LIST_COLUMNS = ('categories', 'entities')
+
+# The pre-typed "name:X type: 1 Salience 0.3, ..." rendering, still found in old snapshots
+LEGACY_ENTITY_RE = re.compile(r"name:(?P<name>.*?) type: (?P<type>\S+) Salience (?P<salience>[0-9.eE+-]+)")
+
+
+def as_entities(value):
+    """
+    The `entities` of a row as a list of {name, type, salience} dicts, whether it came
+    from Parquet (array of dicts), BigQuery (list of dicts), or an old snapshot's string.
+    """
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return []
+    if isinstance(value, str) and value.lstrip().startswith('['):
+        # A list serialized into text (CSV debug export)
+        return as_entities(_decode_list(value))
+    if isinstance(value, str):
+        return [{'name': match['name'], 'type': match['type'], 'salience': float(match['salience'])}
+                for match in LEGACY_ENTITY_RE.finditer(value)]
+    return [dict(entity) for entity in value]
+
+
+def conform_frame(df, schema):
+    """
+    `df` restricted to the schema's columns, in order; missing columns are added as nulls.
+    NaN in list columns becomes None (an all-NaN column is float64, which pyarrow cannot turn into a list).
+    """
+    missing = [name for name in schema.names if name not in df.columns]
+    lists = {field.name: df[field.name].map(_null_nan) for field in schema
+             if pa.types.is_list(field.type) and field.name in df.columns}
+    return df.assign(**lists, **{name: None for name in missing})[schema.names]
+
+
+def _null_nan(value):
+    return None if isinstance(value, float) and np.isnan(value) else value
+
+
+def write_frame(df, path, schema, export_csv=False):
+    """
+    Write `df` as zstd-compressed Parquet with an explicit schema; optionally mirror it to CSV for debugging.
+    Schema columns missing from `df` are written as nulls.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    df = conform_frame(df, schema)
+    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+    pq.write_table(table, path, compression='zstd')
+    if export_csv:
+        encoded = {name: df[name].map(_encode_list) for name in CSV_LIST_COLUMNS if name in df}
+        df.assign(**encoded).to_csv(csv_path(path), index=False)
+    return path
+
+
+def read_frame(path, columns=None):
+    """Read a stage file into pandas; CSV paths are still accepted for old debug exports."""
+    if path.endswith('.csv'):
+        df = pd.read_csv(path, usecols=columns)
+        return df.assign(**{name: df[name].map(_decode_list) for name in CSV_LIST_COLUMNS if name in df})
+    return pq.read_table(path, columns=columns).to_pandas()
+
+
+def _encode_list(value):
+    if _null_nan(value) is None:
+        return None
+    return json.dumps([dict(item) if isinstance(item, dict) else item for item in value])
+
+
+def _decode_list(value):
+    """
+    A JSON array cell back to a list (exports older than the JSON encoding used Python reprs).
+    Other text, like legacy formatted entities, is returned unchanged.
+    """
+    if not isinstance(value, str):
+        return None
+    if not value.lstrip().startswith('['):
+        return value
+    try:
+        return json.loads(value)
+    except ValueError:
+        pass
+    try:
+        decoded = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        decoded = None
+    if not isinstance(decoded, list):
+        raise ValueError(f"CSV cell is not a list: {value[:80]!r}")
+    return decoded
+
+
+def csv_path(path):
+    return os.path.splitext(path)[0] + '.csv'
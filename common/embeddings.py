@@ -0,0 +1,49 @@
+import os
+import re
+import zlib
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"\w+")
+DEFAULT_BACKEND = os.environ.get("EMBEDDING_BACKEND", "hashing")
+
+
+def hashing_embedding(texts, dim=512):
+    """
+    Deterministic, offline embedding: signed feature hashing of word unigrams
+    and bigrams with log term frequency, L2-normalized. Good enough for
+    lexical-semantic recall and for tests; swap in "gemini" for real semantics.
+    """
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        tokens = TOKEN_RE.findall(str(text).lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        if not features:
+            continue
+        hashes = np.fromiter((zlib.crc32(feature.encode("utf-8")) for feature in features), dtype=np.uint32, count=len(features))
+        signs = np.where(hashes & 1, 1.0, -1.0).astype(np.float32)
+        np.add.at(vectors[row], (hashes >> 1) % dim, signs)
+    vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+    return normalize(vectors)
+
+
+def gemini_embedding(texts, model="models/text-embedding-004"):
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    embedder = GoogleGenerativeAIEmbeddings(model=model)
+    return normalize(np.asarray(embedder.embed_documents(list(texts)), dtype=np.float32))
+
+
+EMBEDDING_BACKENDS = {
+    "hashing": hashing_embedding,
+    "gemini": gemini_embedding,
+}
+
+
+def embed(texts, backend=None):
+    """Embed `texts` into an L2-normalized float32 matrix with the named backend."""
+    return EMBEDDING_BACKENDS[backend or DEFAULT_BACKEND](list(texts))
+
+
+def normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
@@ -0,0 +1,262 @@
+import contextlib
+import contextvars
+import functools
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_span_ids = itertools.count(1)
+PROMETHEUS_NAME_RE = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class SamplingProfiler:
+    """
+    Low-overhead statistical profiler for a hot path.
+
+    A daemon thread samples the stack of `thread_id` (default: the thread that
+    starts it) every `interval` seconds. Results are collapsed stacks
+    ("module:function;module:function" -> samples), the input format of
+    flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval=0.005, thread_id=None, max_depth=64):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.max_depth = max_depth
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.thread_id = self.thread_id or threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def top(self, n=15):
+        """The `n` functions most often on top of the stack, as (function, samples)."""
+        leaves = Counter()
+        for stack, count in self.samples.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves.most_common(n)
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+
+class Metrics:
+    """
+    Process-wide instrumentation: counters, span timings and a span event log.
+
+    * `incr(name, value, **labels)` for throughput, errors, bytes and tokens
+    * `with span(name, **attrs)` / `@timed(name)` for stage timings; spans nest
+      into traces and may set more attributes on the yielded dict
+    * spans named in `profile_spans` run under a SamplingProfiler
+    * export as JSON lines, Prometheus text, or live OpenTelemetry spans
+      (`enable_otel()`, needs the optional opentelemetry-api package)
+    """
+
+    def __init__(self, jsonl_path=None, profile_spans=(), max_events=10000):
+        self.jsonl_path = jsonl_path
+        self.profile_spans = {name for name in profile_spans if name}
+        self.counters = defaultdict(float)
+        self.timings = {}
+        self.events = deque(maxlen=max_events)
+        self.profiles = defaultdict(Counter)
+        self._lock = threading.Lock()
+        self._tracer = None
+
+    def incr(self, name, value=1, **labels):
+        with self._lock:
+            self.counters[(name, _label_key(labels))] += value
+
+    def total(self, name):
+        """Value of counter `name` summed over all of its labels."""
+        with self._lock:
+            return sum(value for (counter, _), value in self.counters.items() if counter == name)
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            count, total, peak = self.timings.get(key, (0, 0.0, 0.0))
+            self.timings[key] = (count + 1, total + seconds, max(peak, seconds))
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        parent = _current_span.get()
+        record = {
+            "type": "span", "name": name, "span_id": next(_span_ids),
+            "parent_id": parent["span_id"] if parent else None, "attrs": attrs,
+        }
+        record["trace_id"] = parent["trace_id"] if parent else record["span_id"]
+        token = _current_span.set(record)
+        profiler = SamplingProfiler().start() if name in self.profile_spans else None
+        otel = self._tracer.start_as_current_span(name) if self._tracer is not None else contextlib.nullcontext()
+        record["start"] = time.time()
+        started = time.perf_counter()
+        try:
+            with otel as otel_span:
+                try:
+                    yield record
+                finally:
+                    if otel_span is not None:
+                        for key, value in record["attrs"].items():
+                            otel_span.set_attribute(key, value if isinstance(value, (bool, int, float, str)) else str(value))
+        except BaseException as e:
+            record["error"] = type(e).__name__
+            self.incr("span.errors", span=name, error=record["error"])
+            raise
+        finally:
+            record["duration"] = time.perf_counter() - started
+            _current_span.reset(token)
+            if profiler is not None:
+                profiler.stop()
+                with self._lock:
+                    self.profiles[name].update(profiler.samples)
+            self.observe(name, record["duration"])
+            self.emit(record)
+
+    def timed(self, name=None):
+        """Decorator form of `span`; the span name defaults to module.function."""
+        def decorate(fn):
+            span_name = name or f"{fn.__module__}.{fn.__name__}"
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def emit(self, record):
+        with self._lock:
+            self.events.append(record)
+            if self.jsonl_path:
+                with open(self.jsonl_path, "a") as f:
+                    f.write(json.dumps(record, default=str) + "\n")
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": [{"name": name, "labels": dict(labels), "value": value}
+                             for (name, labels), value in sorted(self.counters.items())],
+                "timings": [{"name": name, "labels": dict(labels), "count": count, "total": total, "max": peak}
+                            for (name, labels), (count, total, peak) in sorted(self.timings.items())],
+            }
+
+    def export_jsonl(self, path):
+        """Write every span event followed by the counter/timing snapshot, one JSON object per line."""
+        snapshot = self.snapshot()
+        with self._lock:
+            events = list(self.events)
+        with open(path, "w") as f:
+            for record in events:
+                f.write(json.dumps(record, default=str) + "\n")
+            for kind in ("counters", "timings"):
+                for entry in snapshot[kind]:
+                    f.write(json.dumps({"type": kind[:-1], **entry}) + "\n")
+        return path
+
+    def to_prometheus(self, prefix="news_"):
+        """Prometheus text exposition: counters as *_total, span timings as *_seconds summaries."""
+        def metric_name(name):
+            return prefix + PROMETHEUS_NAME_RE.sub("_", name)
+
+        def label_text(labels):
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+        snapshot = self.snapshot()
+        lines, typed = [], set()
+        for entry in snapshot["counters"]:
+            name = metric_name(entry["name"]) + "_total"
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{label_text(entry['labels'])} {entry['value']:g}")
+        for entry in snapshot["timings"]:
+            name = metric_name(entry["name"]) + "_seconds"
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} summary")
+            labels = label_text(entry["labels"])
+            lines.append(f"{name}_count{labels} {entry['count']}")
+            lines.append(f"{name}_sum{labels} {entry['total']:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def enable_otel(self, tracer=None):
+        """Also report spans through OpenTelemetry (uses the globally configured tracer provider)."""
+        if tracer is None:
+            from opentelemetry import trace
+            tracer = trace.get_tracer("gcp-news-research-agent")
+        self._tracer = tracer
+        return tracer
+
+    def summary(self):
+        """Human-readable totals for the end of an ETL run."""
+        snapshot = self.snapshot()
+        lines = [f"{entry['name']:<40} {entry['count']:>6}x {entry['total']:>9.2f}s (max {entry['max']:.2f}s)"
+                 for entry in snapshot["timings"] if not entry["labels"]]
+        for entry in snapshot["counters"]:
+            labels = ",".join(f"{key}={value}" for key, value in entry["labels"].items())
+            lines.append(f"{entry['name'] + ('{' + labels + '}' if labels else ''):<60} {entry['value']:g}")
+        return "\n".join(lines)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.timings.clear()
+            self.events.clear()
+            self.profiles.clear()
+
+
+# METRICS_JSONL=path streams span events as they finish; METRICS_PROFILE=span,span profiles those spans
+metrics = Metrics(
+    jsonl_path=os.environ.get("METRICS_JSONL"),
+    profile_spans=os.environ.get("METRICS_PROFILE", "").split(","),
+)
+
+
+def record_bigquery_job(job, stage):
+    """Count the bytes a finished BigQuery query/load job scanned, billed or loaded."""
+    for attribute, name in (("total_bytes_processed", "bq.bytes_scanned"),
+                            ("total_bytes_billed", "bq.bytes_billed"),
+                            ("input_file_bytes", "bq.bytes_loaded")):
+        value = getattr(job, attribute, None)
+        if value:
+            metrics.incr(name, value, stage=stage)
+    if getattr(job, "output_rows", None):
+        metrics.incr("bq.rows_loaded", job.output_rows, stage=stage)
@@ -1 +1 @@
-from .extractor import collect_news
\ No newline at end of file
+from .extractor import collect_news,iter_news
\ No newline at end of file
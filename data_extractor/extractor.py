@@ -1,9 +1,14 @@
 import requests
 import pandas as pd
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import threading
 import time
-import os 
+import os
+from common.data_io import RAW_NEWS_PATH, RAW_NEWS_SCHEMA, write_frame
+from common.metrics import metrics
 
+SERPAPI_URL = os.environ.get("SERPAPI_URL", "https://serpapi.com/search")
 
 category_queries = {
     'AI': 'artificial intelligence OR machine learning OR AI',
@@ -15,9 +20,50 @@ category_queries = {
     'entertainment': 'entertainment OR movies OR music OR celebrity'
 }
 
-def fetch_news_search(category, query, num_results=20):
+# Query parameters that only track the click and never change the article
+TRACKING_PARAMS = {"fbclid", "gclid", "ocid", "cmpid", "mc_cid", "mc_eid", "ref", "taid", "guccounter"}
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second with bursts of up to `capacity`."""
+
+    def __init__(self, rate=5.0, capacity=5):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def normalize_url(url):
+    """Canonical form used for cross-category dedup: lowercase host, no fragment/tracking params/trailing slash."""
+    parts = urlsplit(url.strip())
+    if parts.scheme not in ("http", "https"):
+        return url
+    host = parts.netloc.lower()
+    if host.endswith(":80") or host.endswith(":443"):
+        host = host.rsplit(":", 1)[0]
+    query = urlencode([
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    ])
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), host, path, query, ""))
+
+def fetch_news_search(category, query, num_results=20, start=0, session=None, tbs="qdr:w"):
     """
     Fetch news using Google search news tab
+    tbs: SerpApi time filter, e.g. "qdr:w" (past week) or "qdr:d" (past day)
     """
     params = {
         "api_key": os.environ['SERPAPI_api_key'],
@@ -26,43 +72,89 @@ def fetch_news_search(category, query, num_results=20):
         "q": query,
         "gl": "us",
         "hl": "en",
-        "num": 100,  # Get more results to filter
-        "tbs": "qdr:w"  # Past week for fresh news
+        "num": num_results,
+        "start": start,  # Result offset, for pagination
+        "tbs": tbs  # Past week (by default) for fresh news
     }
-    
+
     try:
-        response = requests.get("https://serpapi.com/search", params=params)
+        response = (session or requests).get(SERPAPI_URL, params=params, timeout=30)
+        metrics.incr("serpapi.requests")
         response.raise_for_status()
         data = response.json()
-        
+
         # Get news results and limit to desired number
         news_results = data.get("news_results", [])[:num_results]
+        metrics.incr("serpapi.results", len(news_results), category=category)
         return news_results
-        
+
     except Exception as e:
+        metrics.incr("serpapi.errors", error=type(e).__name__)
         print(f"Error fetching news for {category}: {e}")
         return []
 
-def collect_news():
-    all_news = []
+def fetch_category(category, query, max_pages=1, page_size=20, rate_limiter=None, session=None, tbs="qdr:w"):
+    """Page through results for one category until `max_pages` pages or a short page."""
+    results = []
+    for page in range(max_pages):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        news_results = fetch_news_search(category, query, num_results=page_size, start=page * page_size,
+                                         session=session, tbs=tbs)
+        results.extend(news_results)
+        if len(news_results) < page_size:
+            break
+    return results
+
+def iter_news(categories=None, max_pages=1, page_size=20, max_workers=4, requests_per_second=5.0, session=None):
+    """
+    Yield one record per unique article across all categories.
+
+    Categories are searched concurrently (rate-limited by a shared token
+    bucket). URLs are normalized and deduplicated, so an article returned
+    for several categories is yielded once with `category` set to the first
+    category it was found under and `categories` listing all of them.
+    """
+    categories = categories if categories is not None else category_queries
+    rate_limiter = TokenBucket(rate=requests_per_second, capacity=max(1, int(requests_per_second)))
+    session = session or requests.Session()
+    articles = {}
     print("🔍 Starting alternative news collection...")
-    
-    for category, query in category_queries.items():
-        print(f"📰 Searching for {category} news...")
-        
-        news_results = fetch_news_search(category, query, num_results=20)
-        
-        for item in news_results:
-            all_news.append({
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(fetch_category, category, query, max_pages, page_size, rate_limiter, session): category
+            for category, query in categories.items()
+        }
+        # Merge in category order so `category` does not depend on which request finished first
+        results_by_category = {}
+        for future in as_completed(futures):
+            category = futures[future]
+            results_by_category[category] = future.result()
+            print(f"✅ Found {len(results_by_category[category])} articles for {category}")
+
+    for category in categories:
+        for item in results_by_category[category]:
+            url = item.get("link")
+            if not url:
+                continue
+            key = normalize_url(url)
+            if key in articles:
+                if category not in articles[key]["categories"]:
+                    articles[key]["categories"].append(category)
+                continue
+            articles[key] = {
                 "category": category,
+                "categories": [category],
                 "headline": item.get("title", "No title available"),
-                "url": item.get("link", "No URL available")})
-        
-        print(f"✅ Found {len(news_results)} articles for {category}")
-        time.sleep(0.5)
-    news_df=pd.DataFrame(all_news)
-    data_path='./data/raw_news.csv'
-    news_df.to_csv(data_path,index=False)
-    return f"\n📊 results: {news_df.shape[0]} articles extracted and stored in {data_path}"
+                "url": url}
 
+    print(f"🧹 {len(articles)} unique articles after cross-category dedup")
+    metrics.incr("collect.articles", len(articles))
+    yield from articles.values()
 
+@metrics.timed("etl.collect_news")
+def collect_news(export_csv=False, **collector_kwargs):
+    news_df=pd.DataFrame(list(iter_news(**collector_kwargs)), columns=RAW_NEWS_SCHEMA.names)
+    data_path=write_frame(news_df, RAW_NEWS_PATH, RAW_NEWS_SCHEMA, export_csv=export_csv)
+    return f"\n📊 results: {news_df.shape[0]} articles extracted and stored in {data_path}"
@@ -0,0 +1,266 @@
+from dotenv import load_dotenv
+load_dotenv()
+"""
+Continuous ingestion: keeps news_data minutes-fresh instead of waiting for the next ETL.py run.
+
+    python ingest_daemon.py        # runs until Ctrl-C / SIGTERM
+
+* Each category in `category_queries` is polled on its own interval
+  (INGEST_POLL_INTERVALS="AI=300,sports=1800", default INGEST_POLL_INTERVAL seconds).
+* Only URLs never seen before, or last crawled more than INGEST_RECRAWL_AFTER
+  seconds ago, are queued; everything else SerpApi returns again is skipped.
+* The queue is drained in micro-batches (scrape -> NLP -> summarize) and each
+  batch is MERGEd into BigQuery, so only new or changed rows are written.
+  The batch is also added to the local semantic-search vectors
+  (./data/embeddings), so the agent's semantic search sees it right away.
+* Polls, the queue and crawl times live in ./data/ingest.sqlite: a restarted
+  daemon picks up the queued URLs and poll schedule where it stopped.
+* Backpressure: a batch that hits NLP/BigQuery quotas halves the batch size
+  and pauses loading with exponential backoff; polling pauses while the queue
+  holds more than `max_pending` URLs. Articles whose NLP call failed on quota
+  or rate limits stay queued and are retried after the pause.
+"""
+import json
+import os
+import signal
+import sqlite3
+import threading
+import time
+import traceback
+
+import requests
+
+from common.data_io import EMBEDDINGS_DIR
+from common.metrics import metrics
+from data_extractor.extractor import TokenBucket, category_queries, fetch_category, normalize_url
+from preprocessor.cache import ContentCache
+from preprocessor.embed_news import append_embeddings
+from preprocessor.html_extract import HtmlExtractor
+from preprocessor.preprocess_data import GCPContentPreprocessor
+from preprocessor.streaming import BigQuerySink, iter_processed_chunks
+
+DEFAULT_CHECKPOINT_PATH = './data/ingest.sqlite'
+POLL_INTERVAL = float(os.environ.get("INGEST_POLL_INTERVAL", 600))
+RECRAWL_AFTER = float(os.environ.get("INGEST_RECRAWL_AFTER", 6 * 3600))
+
+
+def poll_intervals(categories, spec=None):
+    """Seconds between polls per category, from "AI=300,sports=1800" (others use POLL_INTERVAL)."""
+    spec = os.environ.get("INGEST_POLL_INTERVALS", "") if spec is None else spec
+    overrides = dict(item.split("=", 1) for item in spec.split(",") if "=" in item)
+    return {category: float(overrides.get(category, POLL_INTERVAL)) for category in categories}
+
+
+class IngestCheckpoint:
+    """SQLite record of category polls, queued URLs and crawl times."""
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Used by one thread at a time, but not necessarily the one that opened it
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS polls (category TEXT PRIMARY KEY, polled_at REAL);
+            CREATE TABLE IF NOT EXISTS urls (key TEXT PRIMARY KEY, first_seen REAL, crawled_at REAL);
+            CREATE TABLE IF NOT EXISTS pending (key TEXT PRIMARY KEY, record TEXT, queued_at REAL);
+            CREATE INDEX IF NOT EXISTS pending_fifo ON pending(queued_at);
+        """)
+        self._conn.commit()
+
+    def last_polled(self, category):
+        row = self._conn.execute("SELECT polled_at FROM polls WHERE category = ?", (category,)).fetchone()
+        return row[0] if row else 0.0
+
+    def mark_polled(self, category, when):
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO polls VALUES (?, ?)", (category, when))
+
+    def enqueue(self, records, recrawl_after, now):
+        """Queue the unseen or stale `records`; returns how many were queued."""
+        queued = 0
+        with self._conn:
+            for record in records:
+                key = normalize_url(record["url"])
+                pending = self._conn.execute("SELECT record FROM pending WHERE key = ?", (key,)).fetchone()
+                if pending is not None:
+                    # Already queued under another category: just remember this one too
+                    stored = json.loads(pending[0])
+                    if record["category"] not in stored["categories"]:
+                        stored["categories"].append(record["category"])
+                        self._conn.execute("UPDATE pending SET record = ? WHERE key = ?", (json.dumps(stored), key))
+                    continue
+                seen = self._conn.execute("SELECT crawled_at FROM urls WHERE key = ?", (key,)).fetchone()
+                if seen is not None and seen[0] is not None and now - seen[0] < recrawl_after:
+                    continue
+                self._conn.execute("INSERT OR IGNORE INTO urls VALUES (?, ?, NULL)", (key, now))
+                self._conn.execute("INSERT INTO pending VALUES (?, ?, ?)", (key, json.dumps(record), now))
+                queued += 1
+        return queued
+
+    def pending_count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+
+    def oldest_pending(self):
+        """queued_at of the oldest queued URL, or None when the queue is empty."""
+        return self._conn.execute("SELECT MIN(queued_at) FROM pending").fetchone()[0]
+
+    def next_batch(self, limit):
+        """[(key, record, queued_at)] for the `limit` longest-queued URLs (they stay queued until mark_crawled)."""
+        rows = self._conn.execute(
+            "SELECT key, record, queued_at FROM pending ORDER BY queued_at LIMIT ?", (limit,)).fetchall()
+        return [(key, json.loads(record), queued_at) for key, record, queued_at in rows]
+
+    def mark_crawled(self, keys, when):
+        with self._conn:
+            self._conn.executemany("UPDATE urls SET crawled_at = ? WHERE key = ?", [(when, key) for key in keys])
+            self._conn.executemany("DELETE FROM pending WHERE key = ?", [(key,) for key in keys])
+
+    def close(self):
+        self._conn.close()
+
+
+class IngestDaemon:
+    """Poll -> queue -> micro-batch -> MERGE loop; see the module docstring."""
+
+    def __init__(self, categories=None, intervals=None, checkpoint=None, sink=None, preprocess_object=None,
+                 batch_size=50, min_batch_size=5, max_batch_size=200, max_batch_delay=60, max_pending=2000,
+                 recrawl_after=RECRAWL_AFTER, page_size=20, tbs="qdr:d", requests_per_second=1.0,
+                 backoff_base=30.0, backoff_cap=900.0, summarize=True, session=None, tick=1.0,
+                 embeddings_dir=EMBEDDINGS_DIR):
+        self.categories = categories if categories is not None else category_queries
+        self.intervals = intervals or poll_intervals(self.categories)
+        self.checkpoint = checkpoint or IngestCheckpoint()
+        self.sink = sink or BigQuerySink()
+        self._owns_preprocessor = preprocess_object is None
+        # A recrawl must reach the publisher: cached pages expire no later than the recrawl interval
+        # (and are then revalidated with ETag / Last-Modified instead of served from disk)
+        self.preprocess_object = preprocess_object or GCPContentPreprocessor(cache=ContentCache(page_ttl=recrawl_after),
+                                                                             extractor=HtmlExtractor())
+        self.batch_size = batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.max_batch_delay = max_batch_delay
+        self.max_pending = max_pending
+        self.recrawl_after = recrawl_after
+        self.page_size = page_size
+        self.tbs = tbs
+        self.rate_limiter = TokenBucket(rate=requests_per_second, capacity=max(1, int(requests_per_second)))
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.summarize = summarize
+        self.embeddings_dir = embeddings_dir
+        self.session = session or requests.Session()
+        self.tick = tick
+        self.cooldown = 0.0
+        self.resume_at = 0.0
+        self.stopping = threading.Event()
+
+    def poll_due(self, now):
+        """Search every category whose interval has elapsed and queue its unseen/stale URLs."""
+        for category, query in self.categories.items():
+            if now - self.checkpoint.last_polled(category) < self.intervals[category]:
+                continue
+            if self.checkpoint.pending_count() >= self.max_pending:
+                # Loading is behind; new searches would only grow the queue
+                metrics.incr("ingest.polls_deferred")
+                return
+            results = fetch_category(category, query, max_pages=1, page_size=self.page_size,
+                                     rate_limiter=self.rate_limiter, session=self.session, tbs=self.tbs)
+            records = [{"category": category, "categories": [category],
+                        "headline": item.get("title", "No title available"), "url": item["link"]}
+                       for item in results if item.get("link")]
+            queued = self.checkpoint.enqueue(records, self.recrawl_after, now)
+            self.checkpoint.mark_polled(category, now)
+            print(f"🔍 {category}: {len(records)} results, {queued} new or stale queued")
+            metrics.incr("ingest.polls", category=category)
+            metrics.incr("ingest.queued", queued, category=category)
+
+    def process_batch(self, now):
+        """Load one micro-batch if the queue is full enough or old enough; True if a batch was attempted."""
+        oldest = self.checkpoint.oldest_pending()
+        if oldest is None or time.monotonic() < self.resume_at:
+            return False
+        if self.checkpoint.pending_count() < self.batch_size and now - oldest < self.max_batch_delay:
+            return False
+        batch = self.checkpoint.next_batch(self.batch_size)
+        records = [record for _, record, _ in batch]
+        rate_limited_before = metrics.total("nlp.rate_limited")
+        loaded = 0
+        retry_urls = set()
+        try:
+            with metrics.span("ingest.batch", size=len(records)):
+                for _, chunk_df in iter_processed_chunks(records, self.preprocess_object, chunk_size=len(records),
+                                                         summarize=self.summarize, on_retryable=retry_urls.update):
+                    if not chunk_df.empty:
+                        self.sink.write(chunk_df)
+                        if self.embeddings_dir:
+                            append_embeddings(chunk_df, self.embeddings_dir)
+                    loaded += len(chunk_df)
+        except Exception as e:
+            # The batch stays queued and is retried after the cooldown
+            print(f"Batch of {len(records)} failed: {e}\n{traceback.format_exc()}")
+            metrics.incr("ingest.batch_errors", error=type(e).__name__)
+            self.back_off()
+            return True
+        finished = time.time()
+        # Articles that failed on NLP quota stay queued for the next batch instead of waiting for a recrawl
+        crawled = [(key, queued_at) for key, record, queued_at in batch if record["url"] not in retry_urls]
+        self.checkpoint.mark_crawled([key for key, _ in crawled], finished)
+        for _, queued_at in crawled:
+            metrics.observe("ingest.queue_wait", finished - queued_at)
+        metrics.incr("ingest.loaded", loaded)
+        metrics.incr("ingest.requeued", len(retry_urls))
+        print(f"📦 Batch of {len(records)}: {loaded} rows loaded, {len(retry_urls)} requeued, "
+              f"{self.checkpoint.pending_count()} still queued")
+        if retry_urls or metrics.total("nlp.rate_limited") > rate_limited_before:
+            self.back_off()
+        else:
+            self.speed_up()
+        return True
+
+    def back_off(self):
+        """Downstream quota is saturated: smaller batches, and a growing pause before the next one."""
+        self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+        self.cooldown = min(self.backoff_cap, max(self.backoff_base, self.cooldown * 2))
+        self.resume_at = time.monotonic() + self.cooldown
+        print(f"⏸️ Backing off {self.cooldown:.0f}s, batch size now {self.batch_size}")
+        metrics.incr("ingest.backoffs")
+
+    def speed_up(self):
+        self.batch_size = min(self.max_batch_size, self.batch_size + self.min_batch_size)
+        self.cooldown = 0.0
+
+    def run(self):
+        """Poll and load until stop() is called."""
+        print(f"🚀 Ingesting {len(self.categories)} categories; {self.checkpoint.pending_count()} URLs queued from the last run")
+        try:
+            while not self.stopping.is_set():
+                now = time.time()
+                self.poll_due(now)
+                if not self.process_batch(now):
+                    self.stopping.wait(self.tick)
+        finally:
+            self.close()
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def close(self):
+        self.sink.close()
+        self.checkpoint.close()
+        if self._owns_preprocessor:
+            self.preprocess_object.extractor.close()
+            self.preprocess_object.cache.close()
+
+
+def main():
+    daemon = IngestDaemon()
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    daemon.run()
+    print(metrics.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,27 @@
-from .preprocess_data import extract_and_preprocess
-from .data_merger import combine_data
-from .data_insert import create_table_from_csv_direct
\ No newline at end of file
+import importlib
+
+# Public API -> defining submodule. Submodules are imported on first attribute access (PEP 562),
+# so `import preprocessor` does not pull in google.cloud, newspaper or pyarrow up front.
+_EXPORTS = {
+    "extract_and_preprocess": ".preprocess_data",
+    "combine_data": ".data_merger",
+    "create_table_from_csv_direct": ".data_insert",
+    "load_incremental": ".data_insert",
+    "build_embedding_index": ".embed_news",
+    "append_embeddings": ".embed_news",
+    "precompute_summaries": ".summarize",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
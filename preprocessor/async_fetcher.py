@@ -0,0 +1,153 @@
+import asyncio
+import random
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from common.metrics import metrics
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
+}
+# Statuses worth another attempt; anything else is returned to the caller as-is
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status: int = None          # None when the request never got a response
+    text: str = None
+    error: str = None
+    headers: dict = field(default_factory=dict)
+    attempts: int = 0
+    from_cache: bool = False
+
+
+class AsyncFetcher:
+    """
+    Fetch many URLs concurrently over pooled keep-alive connections.
+
+    Concurrency is capped globally (`max_concurrency`) and per host
+    (`per_domain_limit`) so a handful of slow publishers cannot take over
+    the whole batch. Every attempt has its own deadline (`timeout`) and
+    failed attempts are retried with full-jitter exponential backoff.
+
+    With a `ContentCache`, fresh pages are served from disk and stale ones
+    are revalidated with conditional requests (If-None-Match / If-Modified-Since).
+    """
+
+    def __init__(self, max_concurrency=50, per_domain_limit=4, timeout=15, connect_timeout=5,
+                 retries=2, backoff_base=0.5, backoff_cap=8.0, headers=None, cache=None):
+        self.max_concurrency = max_concurrency
+        self.per_domain_limit = per_domain_limit
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.headers = headers or DEFAULT_HEADERS
+        self.cache = cache
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(self.backoff_cap, retry_after)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def _domain_semaphore(self, url):
+        domain = urlsplit(url).netloc.lower()
+        if domain not in self._domain_semaphores:
+            self._domain_semaphores[domain] = asyncio.Semaphore(self.per_domain_limit)
+        return self._domain_semaphores[domain]
+
+    async def _cache_call(self, method, *args):
+        """Run a ContentCache method (SQLite + zlib) on a worker thread so it never stalls the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(None, method, *args)
+
+    async def _fetch_one(self, session, url):
+        result = FetchResult(url=url)
+        if urlsplit(url).scheme not in ("http", "https"):
+            result.error = f"Invalid URL: {url}"
+            return result
+
+        cached = await self._cache_call(self.cache.get_page, url) if self.cache is not None else None
+        if cached is not None and cached['fresh']:
+            metrics.incr("fetch.cache_hits")
+            return FetchResult(url=url, status=200, text=cached['text'], from_cache=True)
+        conditional_headers = {}
+        if cached is not None:
+            if cached['etag']:
+                conditional_headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                conditional_headers['If-Modified-Since'] = cached['last_modified']
+
+        # Take the per-domain slot first so waiting on a busy host does not hold a global slot
+        async with self._domain_semaphore(url):
+            for attempt in range(self.retries + 1):
+                result.attempts = attempt + 1
+                retry_after = None
+                async with self._global_semaphore:
+                    try:
+                        async with session.get(url, headers=conditional_headers, allow_redirects=True) as response:
+                            result.status = response.status
+                            result.headers = dict(response.headers)
+                            result.error = None
+                            if response.status == 304 and cached is not None:
+                                await self._cache_call(self.cache.mark_revalidated, url)
+                                result.status, result.text, result.from_cache = 200, cached['text'], True
+                                return result
+                            if response.status == 200:
+                                body = await response.read()
+                                metrics.incr("fetch.bytes", len(body))
+                                result.text = body.decode(response.get_encoding(), errors="replace")
+                                if self.cache is not None:
+                                    await self._cache_call(self.cache.put_page, url, result.text, result.headers)
+                                return result
+                            if response.status not in RETRY_STATUSES:
+                                return result
+                            retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        result.status = None
+                        result.error = f"{type(e).__name__}: {e}"
+                if attempt < self.retries:
+                    await asyncio.sleep(self._backoff(attempt, retry_after))
+        return result
+
+    async def fetch_all_async(self, urls, on_result=None):
+        """Fetch `urls` (deduplicated, order preserved); `on_result` is called as each one finishes."""
+        urls = list(dict.fromkeys(urls))
+        self._global_semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._domain_semaphores = {}
+        connector = aiohttp.TCPConnector(
+            limit=self.max_concurrency,
+            limit_per_host=self.per_domain_limit,
+            keepalive_timeout=30,
+            ttl_dns_cache=300,
+        )
+        async with aiohttp.ClientSession(connector=connector, timeout=self.timeout, headers=self.headers) as session:
+            async def run(url):
+                try:
+                    result = await self._fetch_one(session, url)
+                except Exception as e:
+                    # e.g. a UnicodeError from IDNA-encoding a malformed host: fail this URL, not the batch
+                    result = FetchResult(url=url, error=f"{type(e).__name__}: {e}", attempts=1)
+                # 200 / 404 / ... or the exception class for transport failures
+                outcome = result.status if result.status is not None else (result.error or "error").split(":")[0]
+                metrics.incr("fetch.results", outcome=outcome)
+                if result.attempts > 1:
+                    metrics.incr("fetch.retries", result.attempts - 1)
+                if on_result is not None:
+                    on_result(result)
+                return result
+            return await asyncio.gather(*(run(url) for url in urls))
+
+    def fetch_all(self, urls, on_result=None):
+        return asyncio.run(self.fetch_all_async(urls, on_result=on_result))
+
+
+def _parse_retry_after(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
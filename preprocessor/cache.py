@@ -0,0 +1,157 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+DEFAULT_CACHE_PATH = './data/cache.sqlite'
+
+
+def text_hash(text, namespace=''):
+    """Content address for cleaned article text (`namespace` lets callers version their results)."""
+    return hashlib.sha256(f"{namespace}:{text}".encode('utf-8')).hexdigest()
+
+
+class ContentCache:
+    """
+    Persistent SQLite cache shared by the scrape and NLP stages.
+
+    * pages: keyed by URL. Entries younger than `page_ttl` are served without
+      touching the network; older ones are revalidated with ETag /
+      Last-Modified and only re-downloaded when the publisher says they changed.
+    * nlp: keyed by a hash of the cleaned text, so an unchanged article skips
+      the NLP call even if it shows up under a new URL.
+
+    Each layer is LRU-evicted (by last access) once it exceeds its byte
+    budget, down to `low_water` of the budget so eviction runs in batches.
+    Byte totals are kept in memory instead of re-summed on every write.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, page_ttl=24 * 3600,
+                 max_page_bytes=512 * 1024 * 1024, max_nlp_bytes=64 * 1024 * 1024, low_water=0.9):
+        self.path = path
+        self.page_ttl = page_ttl
+        self.max_bytes = {'pages': max_page_bytes, 'nlp': max_nlp_bytes}
+        self.low_water = low_water
+        self.stats = {
+            'page_hits': 0, 'page_misses': 0, 'page_stale': 0, 'page_revalidated': 0,
+            'nlp_hits': 0, 'nlp_misses': 0, 'evictions': 0,
+        }
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY, body BLOB, etag TEXT, last_modified TEXT,
+                fetched_at REAL, accessed_at REAL, size INTEGER);
+            CREATE TABLE IF NOT EXISTS nlp (
+                key TEXT PRIMARY KEY, result TEXT,
+                created_at REAL, accessed_at REAL, size INTEGER);
+            CREATE INDEX IF NOT EXISTS pages_lru ON pages(accessed_at);
+            CREATE INDEX IF NOT EXISTS nlp_lru ON nlp(accessed_at);
+        """)
+        self._conn.commit()
+        self._bytes = {table: self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+                       for table in self.max_bytes}
+
+    # ---- scrape layer -------------------------------------------------
+
+    def get_page(self, url):
+        """Return {'text', 'etag', 'last_modified', 'fresh'} for `url`, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                self.stats['page_misses'] += 1
+                return None
+            self._conn.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+        body, etag, last_modified, fetched_at = row
+        fresh = time.time() - fetched_at < self.page_ttl
+        self.stats['page_hits' if fresh else 'page_stale'] += 1
+        return {
+            'text': zlib.decompress(body).decode('utf-8'),
+            'etag': etag,
+            'last_modified': last_modified,
+            'fresh': fresh,
+        }
+
+    def put_page(self, url, text, headers=None):
+        headers = {name.lower(): value for name, value in (headers or {}).items()}
+        body = zlib.compress(text.encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            self._replace('pages', 'url', url, len(body))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, body, headers.get('etag'), headers.get('last-modified'), now, now, len(body)),
+            )
+            self._evict('pages')
+            self._conn.commit()
+
+    def mark_revalidated(self, url):
+        """Publisher answered 304 Not Modified: restart the TTL for the cached copy."""
+        with self._lock:
+            self._conn.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+            self.stats['page_revalidated'] += 1
+
+    # ---- NLP layer ----------------------------------------------------
+
+    def get_nlp(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM nlp WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats['nlp_misses'] += 1
+                return None
+            self._conn.execute("UPDATE nlp SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.stats['nlp_hits'] += 1
+        return json.loads(row[0])
+
+    def put_nlp(self, key, result):
+        payload = json.dumps(result)
+        now = time.time()
+        with self._lock:
+            self._replace('nlp', 'key', key, len(payload))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO nlp VALUES (?, ?, ?, ?, ?)",
+                (key, payload, now, now, len(payload)),
+            )
+            self._evict('nlp')
+            self._conn.commit()
+
+    # ---- housekeeping -------------------------------------------------
+
+    def _replace(self, table, key_column, key, size):
+        """Account for a row about to be written over (primary-key lookup, no table scan)."""
+        row = self._conn.execute(f"SELECT size FROM {table} WHERE {key_column} = ?", (key,)).fetchone()
+        self._bytes[table] += size - (row[0] if row else 0)
+
+    def _evict(self, table):
+        if self._bytes[table] <= self.max_bytes[table]:
+            return
+        excess = self._bytes[table] - int(self.max_bytes[table] * self.low_water)
+        key_column = 'url' if table == 'pages' else 'key'
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute(f"SELECT {key_column}, size FROM {table} ORDER BY accessed_at"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany(f"DELETE FROM {table} WHERE {key_column} = ?", victims)
+        self._bytes[table] -= freed
+        if freed < excess:
+            # Another process shares the file and already evicted rows we counted: resync once
+            self._bytes[table] = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+        self.stats['evictions'] += len(victims)
+
+    def summary(self):
+        return ', '.join(f"{name}={value}" for name, value in self.stats.items())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,7 +1,31 @@
 import pandas as pd
 from google.cloud import bigquery
 from google.cloud.exceptions import NotFound
+import hashlib
+import json
 import os
+import tempfile
+import uuid
+from common import backends
+from common.metrics import metrics, record_bigquery_job
+from common.data_io import NEWS_SCHEMA, as_entities, read_frame, write_frame
+
+# Columns shared by the stage file, the staging table and news_data
+NEWS_COLUMNS = ["category", "headline", "url", "extracted_text", "sentiment_score", "sentiment_magnitude", "entities",
+                "detailed_category", "category_confidence", "cluster_id", "heading", "summary", "categories", "summarized_at"]
+FLOAT_COLUMNS = ["sentiment_score", "sentiment_magnitude", "category_confidence"]
+STRING_COLUMNS = [column for column in NEWS_COLUMNS
+                  if column not in FLOAT_COLUMNS + ["entities", "categories", "summarized_at"]]
+# Columns that define "the same article content"; a change in any of them triggers an update
+HASHED_COLUMNS = ["category", "headline", "extracted_text", "sentiment_score", "sentiment_magnitude", "entities",
+                  "detailed_category", "category_confidence", "cluster_id", "heading", "summary", "categories"]
+STAGING_TABLE_ID = "news_data_staging"
+WATERMARK_TABLE_ID = "load_watermarks"
+ENTITIES_FIELD = bigquery.SchemaField("entities", "RECORD", mode="REPEATED", fields=[
+    bigquery.SchemaField("name", "STRING"),
+    bigquery.SchemaField("type", "STRING"),
+    bigquery.SchemaField("salience", "FLOAT64"),
+])
 
 def create_dataset_if_not_exists(client, project_id, dataset_id, location="US"):
     """Create a BigQuery dataset if it doesn't exist."""
@@ -17,7 +41,9 @@ def create_dataset_if_not_exists(client, project_id, dataset_id, location="US"):
         dataset = client.create_dataset(dataset, timeout=30)
         print(f"Created dataset {dataset_id} in location {location}")
 
+@metrics.timed("etl.create_table_from_csv_direct")
 def create_table_from_csv_direct(file):
+    """Full reload of news_data from a Parquet stage file (or a CSV debug export)."""
     client = bigquery.Client()
     
     project_id = os.environ['PROJECT_ID']  
@@ -34,28 +60,44 @@ def create_table_from_csv_direct(file):
         bigquery.SchemaField("headline", "STRING"),
         bigquery.SchemaField("url", "STRING"),
         bigquery.SchemaField("extracted_text", "STRING"),
-        bigquery.SchemaField("sentiment", "STRING"),
-        bigquery.SchemaField("entities", "STRING"),
+        bigquery.SchemaField("sentiment_score", "FLOAT64"),
+        bigquery.SchemaField("sentiment_magnitude", "FLOAT64"),
         bigquery.SchemaField("detailed_category", "STRING"),
+        bigquery.SchemaField("category_confidence", "FLOAT64"),
+        bigquery.SchemaField("cluster_id", "STRING"),
+        bigquery.SchemaField("heading", "STRING"),
+        bigquery.SchemaField("summary", "STRING"),
     ]
     
+    converted = None
+    if not file.endswith('.parquet'):
+        # A positional CSV schema cannot carry the list columns: re-type the debug export and load it as Parquet
+        df = read_frame(file)
+        df["entities"] = df["entities"].map(as_entities)
+        df["summarized_at"] = pd.to_datetime(df["summarized_at"], utc=True)
+        file = converted = write_frame(df, os.path.join(tempfile.mkdtemp(), 'news.parquet'), NEWS_SCHEMA)
+
     # Job configuration
+    parquet_options = bigquery.ParquetOptions()
+    parquet_options.enable_list_inference = True  # list<string> -> REPEATED STRING, list<struct> -> REPEATED RECORD
     job_config = bigquery.LoadJobConfig(
-        schema=schema,
-        skip_leading_rows=1,
-        source_format=bigquery.SourceFormat.CSV,
+        schema=schema + [
+            ENTITIES_FIELD,
+            bigquery.SchemaField("categories", "STRING", mode="REPEATED"),
+            bigquery.SchemaField("summarized_at", "TIMESTAMP"),
+        ],
+        source_format=bigquery.SourceFormat.PARQUET,
         write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
-        allow_quoted_newlines=True,  # Important for CSV with multiline text
-        allow_jagged_rows=False,
-        max_bad_records=0,
+        parquet_options=parquet_options,
     )
     
     try:
-        # Load data from CSV file
+        # Load data from the Parquet file
         with open(file, "rb") as source_file:
             job = client.load_table_from_file(source_file, table_ref, job_config=job_config)
         
         job.result()  # Wait for completion
+        record_bigquery_job(job, "full_load")
         print(f"Loaded {job.output_rows} rows into {table_ref}")
         
         # Verify the load
@@ -68,80 +110,207 @@ def create_table_from_csv_direct(file):
         if 'job' in locals():
             for error in job.errors or []:
                 print(f"Job error: {error}")
+    finally:
+        if converted is not None:
+            os.remove(converted)
+
+# ---- Incremental load (MERGE) ---------------------------------------------
+
+def news_table_schema():
+    """news_data schema for incremental loads: the CSV columns plus content_hash and ingested_at."""
+    return [bigquery.SchemaField(name, "STRING") for name in STRING_COLUMNS] + [
+        bigquery.SchemaField(name, "FLOAT64") for name in FLOAT_COLUMNS] + [
+        ENTITIES_FIELD,
+        bigquery.SchemaField("categories", "STRING", mode="REPEATED"),
+        bigquery.SchemaField("summarized_at", "TIMESTAMP"),
+        bigquery.SchemaField("content_hash", "STRING"),
+        bigquery.SchemaField("ingested_at", "TIMESTAMP"),
+    ]
+
+def as_categories(values):
+    if values is None:
+        return []
+    if isinstance(values, str):
+        # list("['AI']") would store one category per character
+        raise ValueError(f"categories must be a list, got the string {values!r}")
+    return list(values)
+
+def add_content_hash(df):
+    """Add a `content_hash` column (sha256 over HASHED_COLUMNS) used to detect changed rows."""
+    df = df.copy()
+    hashed = df[HASHED_COLUMNS].copy()
+    hashed["categories"] = hashed["categories"].map(lambda values: ",".join(sorted(values)))
+    hashed["entities"] = hashed["entities"].map(lambda values: json.dumps(values, sort_keys=True))
+    joined = hashed.astype(str).agg("\x1f".join, axis=1)
+    df["content_hash"] = [hashlib.sha256(value.encode("utf-8")).hexdigest() for value in joined]
+    return df
+
+def batch_id_for(df):
+    """Deterministic id for a delta: reloading the same rows yields the same id."""
+    digest = hashlib.sha256()
+    for key in sorted(df["url"] + ":" + df["content_hash"]):
+        digest.update(key.encode("utf-8"))
+    return digest.hexdigest()
+
+def build_existing_hashes_sql(table_ref):
+    """
+    Stored hashes for the incoming URLs. An article can be re-seen long after it was first
+    ingested, so there is no partition filter: every partition is scanned, but only the
+    url and content_hash columns are read (url is the second clustering key, after
+    category, so it prunes little on its own).
+    """
+    return f"""
+    SELECT url, content_hash
+    FROM `{table_ref}`
+    WHERE url IN UNNEST(@urls)
+    """
+
+def build_watermark_check_sql(watermark_ref):
+    return f"""
+    SELECT COUNT(*) AS loaded
+    FROM `{watermark_ref}`
+    WHERE batch_id = @batch_id
+    """
+
+def build_merge_sql(target_ref, staging_ref, watermark_ref, columns=NEWS_COLUMNS):
+    """
+    Upsert the staged delta into news_data and record the batch watermark in one transaction.
+
+    Rows are matched on url; a matched row is only rewritten when its content_hash changed.
+    The query expects @batch_id and @row_count parameters.
+    """
+    update_set = ",\n            ".join(f"{column} = S.{column}" for column in columns + ["content_hash"] if column != "url")
+    insert_columns = ", ".join(columns + ["content_hash", "ingested_at"])
+    insert_values = ", ".join([f"S.{column}" for column in columns + ["content_hash"]] + ["CURRENT_TIMESTAMP()"])
+    return f"""
+    BEGIN TRANSACTION;
+
+    MERGE `{target_ref}` T
+    USING (
+        SELECT * EXCEPT(row_num) FROM (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY url ORDER BY content_hash) AS row_num
+            FROM `{staging_ref}`
+        )
+        WHERE row_num = 1
+    ) S
+    ON T.url = S.url
+    WHEN MATCHED AND T.content_hash IS DISTINCT FROM S.content_hash THEN
+        UPDATE SET
+            {update_set},
+            ingested_at = CURRENT_TIMESTAMP()
+    WHEN NOT MATCHED THEN
+        INSERT ({insert_columns})
+        VALUES ({insert_values});
+
+    INSERT INTO `{watermark_ref}` (batch_id, row_count, loaded_at)
+    VALUES (@batch_id, @row_count, CURRENT_TIMESTAMP());
+
+    COMMIT TRANSACTION;
+    """
+
+def create_news_table_if_not_exists(client, table_ref):
+    """Create news_data partitioned by day of ingested_at and clustered by category, url."""
+    try:
+        table = client.get_table(table_ref)
+    except NotFound:
+        table = bigquery.Table(table_ref, schema=news_table_schema())
+        table.time_partitioning = bigquery.TimePartitioning(
+            type_=bigquery.TimePartitioningType.DAY, field="ingested_at"
+        )
+        table.clustering_fields = ["category", "url"]
+        client.create_table(table)
+        print(f"Created partitioned table {table_ref}")
+        return
+    # A table created by the full (WRITE_TRUNCATE) loader lacks the incremental columns
+    existing = {field.name: field for field in table.schema}
+    if "entities" in existing and existing["entities"].field_type == "STRING":
+        raise ValueError(f"{table_ref} stores entities as formatted text; reload it once with "
+                         "create_table_from_csv_direct (load_mode='full') to switch to the typed schema")
+    missing = [field for field in news_table_schema() if field.name not in existing]
+    if missing:
+        table.schema = list(table.schema) + missing
+        client.update_table(table, ["schema"])
+        print(f"Added columns {[field.name for field in missing]} to {table_ref} (table is not partitioned; recreate it to enable partitioning)")
+
+def create_watermark_table_if_not_exists(client, watermark_ref):
+    schema = [
+        bigquery.SchemaField("batch_id", "STRING"),
+        bigquery.SchemaField("row_count", "INT64"),
+        bigquery.SchemaField("loaded_at", "TIMESTAMP"),
+    ]
+    client.create_table(bigquery.Table(watermark_ref, schema=schema), exists_ok=True)
+
+@metrics.timed("etl.load_incremental")
+def load_incremental(file):
+    """Stage only new or changed rows from `file` and MERGE them into news_data."""
+    return load_incremental_frame(read_frame(file, columns=NEWS_COLUMNS))
+
+def load_incremental_frame(df, client=None):
+    """MERGE the new or changed rows of `df` into news_data (used per chunk by the streaming ETL)."""
+    client = client or backends.get("bigquery")
 
-# Alternative: More robust version with better error handling
-def create_news_table_and_insert_data_robust(file):
-    """More robust version with comprehensive error handling."""
-    client = bigquery.Client()
-    
     project_id = os.environ['PROJECT_ID']
     dataset_id = "news"
-    table_id = "news_data"
-    
-    try:
-        # Step 1: Create dataset if it doesn't exist
-        dataset_ref = f"{project_id}.{dataset_id}"
-        try:
-            client.get_dataset(dataset_ref)
-            print(f"Dataset {dataset_id} exists.")
-        except NotFound:
-            dataset = bigquery.Dataset(dataset_ref)
-            dataset.location = "US"
-            dataset.description = "Dataset for news articles data"
-            dataset = client.create_dataset(dataset, timeout=30)
-            print(f"Created dataset {dataset_id}")
-        
-        # Step 2: Define table schema
-        table_ref = f"{project_id}.{dataset_id}.{table_id}"
-        schema = [
-            bigquery.SchemaField("category", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("headline", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("url", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("extracted_text", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("sentiment", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("entities", "STRING", mode="NULLABLE"),
-            bigquery.SchemaField("detailed_category", "STRING", mode="NULLABLE"),
-        ]
-        
-        # Step 3: Create or replace table
-        table = bigquery.Table(table_ref, schema=schema)
-        table.description = "News articles with sentiment analysis and entity extraction"
-        
-        try:
-            # Try to delete existing table first
-            client.delete_table(table_ref, not_found_ok=True)
-            print(f"Deleted existing table {table_id}")
-        except Exception as e:
-            print(f"Note: Could not delete existing table: {e}")
-        
-        # Create new table
-        table = client.create_table(table)
-        print(f"Created table {table_id}")
-        
-        # Step 4: Load data using pandas (more reliable for complex CSV)
-        df = pd.read_csv(file)
-        print(f"Loaded {len(df)} rows from CSV")
-        
-        # Clean data
-        df = df.fillna("")  # Replace NaN with empty strings
-        
-        # Load data to BigQuery
-        job_config = bigquery.LoadJobConfig(
-            schema=schema,
+    table_ref = f"{project_id}.{dataset_id}.news_data"
+    watermark_ref = f"{project_id}.{dataset_id}.{WATERMARK_TABLE_ID}"
+
+    create_dataset_if_not_exists(client, project_id, dataset_id)
+    create_news_table_if_not_exists(client, table_ref)
+    create_watermark_table_if_not_exists(client, watermark_ref)
+
+    df = df[NEWS_COLUMNS].copy()
+    df[STRING_COLUMNS] = df[STRING_COLUMNS].fillna("").astype(str)
+    df[FLOAT_COLUMNS] = df[FLOAT_COLUMNS].astype(float)
+    df["entities"] = df["entities"].map(as_entities)
+    df["categories"] = df["categories"].map(as_categories)
+    df["summarized_at"] = pd.to_datetime(df["summarized_at"], utc=True)
+    df = add_content_hash(df.drop_duplicates(subset="url"))
+
+    # Drop rows whose (url, content_hash) is already stored
+    existing_job = client.query(
+        build_existing_hashes_sql(table_ref),
+        job_config=bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ArrayQueryParameter("urls", "STRING", df["url"].tolist())
+        ]),
+    )
+    stored = {(row["url"], row["content_hash"]) for row in existing_job.result()}
+    record_bigquery_job(existing_job, "existing_hashes")
+    delta = df[[(url, h) not in stored for url, h in zip(df["url"], df["content_hash"])]]
+    if delta.empty:
+        return f"No new or changed rows; {table_ref} is up to date"
+
+    batch_id = batch_id_for(delta)
+    batch_params = [bigquery.ScalarQueryParameter("batch_id", "STRING", batch_id)]
+    loaded = client.query(
+        build_watermark_check_sql(watermark_ref),
+        job_config=bigquery.QueryJobConfig(query_parameters=batch_params),
+    ).result()
+    if next(iter(loaded))["loaded"]:
+        return f"Batch {batch_id[:12]} was already loaded into {table_ref}; skipping"
+
+    # One staging table per load: the daemon, ETL.py and streaming loads may MERGE concurrently
+    staging_ref = f"{project_id}.{dataset_id}.{STAGING_TABLE_ID}_{batch_id[:16]}_{uuid.uuid4().hex[:8]}"
+    staging_schema = [field for field in news_table_schema() if field.name != "ingested_at"]
+    job = client.load_table_from_dataframe(
+        delta, staging_ref,
+        job_config=bigquery.LoadJobConfig(
+            schema=staging_schema,
             write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+        ),
+    )
+    job.result()
+    record_bigquery_job(job, "staging")
+    print(f"Staged {job.output_rows} new/changed rows into {staging_ref}")
+
+    try:
+        merge_job = client.query(
+            build_merge_sql(table_ref, staging_ref, watermark_ref),
+            job_config=bigquery.QueryJobConfig(query_parameters=batch_params + [
+                bigquery.ScalarQueryParameter("row_count", "INT64", len(delta))
+            ]),
         )
-        
-        job = client.load_table_from_dataframe(df, table_ref, job_config=job_config)
-        job.result()  # Wait for completion
-        
-        print(f"Successfully loaded {job.output_rows} rows into {table_ref}")
-        
-        # Verify
-        table = client.get_table(table_ref)
-        print(f"Table now contains {table.num_rows} rows")
-        
-        return table_ref
-        
-    except Exception as e:
-        print(f"Error: {e}")
-        return None
\ No newline at end of file
+        merge_job.result()
+        record_bigquery_job(merge_job, "merge")
+    finally:
+        client.delete_table(staging_ref, not_found_ok=True)
+    return f"Merged {len(delta)} new/changed rows into {table_ref} (batch {batch_id[:12]})"
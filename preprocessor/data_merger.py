@@ -1,10 +1,32 @@
 import pandas as pd
+from common.data_io import RAW_NEWS_PATH, PREPROCESSED_NEWS_PATH, NEWS_PATH, NEWS_SCHEMA, read_frame, write_frame
+from common.metrics import metrics
 
+# `error` prefix of articles whose NLP call hit a quota, rate limit or transient failure
+RETRY_ERROR_PREFIX = "GCP NLP RETRY"
 
-def combine_data():
-    news_df=pd.read_csv('./data/raw_news.csv')
-    preprocessed_news_df=pd.read_csv('./data/preprocessed_news.csv')
-    ERROR_STRINGS = ["Failed to fetch page","Content too short or access restricted","ERROR","GCP NLP ERROR"]
-    mask = preprocessed_news_df[['extracted_text', 'sentiment', 'entities', 'detailed_category']].apply(lambda s: ~s.astype(str).str.contains('|'.join(ERROR_STRINGS)), axis=1).all(axis=1)
-    pd.merge(news_df,preprocessed_news_df[mask],on='url',how='inner').to_csv('./data/news.csv',index=False)
-    return 'Data combined at ./data/news.csv '
\ No newline at end of file
+
+def failed_rows(preprocessed_news_df):
+    """Boolean mask of rows the preprocessor marked with an error (fetch, paywall/length or NLP failure)."""
+    return preprocessed_news_df['error'].notna()
+
+
+def retryable_rows(preprocessed_news_df):
+    """Boolean mask of failed rows that should be analyzed again rather than dropped for good."""
+    return preprocessed_news_df['error'].fillna('').astype(str).str.startswith(RETRY_ERROR_PREFIX)
+
+
+def merge_and_filter(news_df, preprocessed_news_df):
+    failed=failed_rows(preprocessed_news_df)
+    metrics.incr("merge.dropped", int(failed.sum()))
+    return pd.merge(news_df,preprocessed_news_df[~failed].drop(columns='error'),on='url',how='inner')
+
+
+@metrics.timed("etl.combine_data")
+def combine_data(export_csv=False):
+    news_df=read_frame(RAW_NEWS_PATH)
+    preprocessed_news_df=read_frame(PREPROCESSED_NEWS_PATH)
+    combined_df=merge_and_filter(news_df,preprocessed_news_df)
+    metrics.incr("merge.rows", len(combined_df))
+    write_frame(combined_df, NEWS_PATH, NEWS_SCHEMA, export_csv=export_csv)
+    return f'Data combined at {NEWS_PATH} '
\ No newline at end of file
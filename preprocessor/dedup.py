@@ -0,0 +1,103 @@
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from .cache import text_hash
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def cluster_key(text):
+    """Cluster id for a representative article (stable across runs for the same text)."""
+    return text_hash(text, 'cluster')[:16]
+
+
+def shingles(text, size=5):
+    """32-bit hashes of the overlapping `size`-word shingles of `text`."""
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) < size:
+        tokens = tokens + [''] * (size - len(tokens))
+    grams = {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+    return np.fromiter((zlib.crc32(gram.encode('utf-8')) for gram in grams), dtype=np.uint64, count=len(grams))
+
+
+class NearDuplicateIndex:
+    """
+    Incremental MinHash/LSH index that groups syndicated copies of the same story.
+
+    `add(text)` computes a MinHash signature for the text's word shingles
+    (one vectorized (num_perm x shingles) NumPy pass). Candidates come from
+    LSH band buckets and are confirmed by their estimated Jaccard similarity.
+    The first article of a cluster is its representative. Only representatives
+    need NLP; `results` keeps their insights so later copies, including copies
+    in later chunks of a streaming run, can reuse them.
+
+    At most `max_clusters` clusters are remembered; the least recently
+    matched ones are evicted, so memory stays flat over long streams.
+    """
+
+    def __init__(self, num_perm=128, bands=32, shingle_size=5, threshold=0.8, seed=1, max_clusters=5000):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        rng = np.random.RandomState(seed)
+        # Coefficients below 2**31 keep a * h + b inside uint64 for 32-bit shingle hashes
+        self.a = rng.randint(1, 1 << 31, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, 1 << 31, size=num_perm).astype(np.uint64)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        self.max_clusters = max_clusters
+        self.buckets = [{} for _ in range(bands)]
+        self.signatures = OrderedDict()   # cluster id -> representative signature, least recently matched first
+        self.results = {}      # cluster id -> representative NLP insights
+        self.failed = set()    # cluster ids whose representative NLP call failed
+        self.lock = threading.Lock()
+
+    def signature(self, text):
+        hashes = shingles(text, self.shingle_size)
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=1)
+
+    def band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, text):
+        """Return (cluster_id, is_representative) for `text`, registering it as a new cluster if unmatched."""
+        signature = self.signature(text)
+        band_keys = self.band_keys(signature)
+        with self.lock:
+            candidates = {cluster_id for band, key in zip(self.buckets, band_keys) for cluster_id in band.get(key, ())}
+            best, best_similarity = None, self.threshold
+            for cluster_id in candidates:
+                similarity = float(np.mean(self.signatures[cluster_id] == signature))
+                if similarity >= best_similarity:
+                    best, best_similarity = cluster_id, similarity
+            if best is not None:
+                self.signatures.move_to_end(best)
+                return best, False
+            cluster_id = cluster_key(text)
+            if cluster_id in self.signatures:  # exact same text seen before
+                self.signatures.move_to_end(cluster_id)
+                return cluster_id, False
+            self.signatures[cluster_id] = signature
+            for band, key in zip(self.buckets, band_keys):
+                band.setdefault(key, []).append(cluster_id)
+            while len(self.signatures) > self.max_clusters:
+                self._evict_oldest()
+            return cluster_id, True
+
+    def _evict_oldest(self):
+        cluster_id, signature = self.signatures.popitem(last=False)
+        for band, key in zip(self.buckets, self.band_keys(signature)):
+            members = band[key]
+            members.remove(cluster_id)
+            if not members:
+                del band[key]
+        self.results.pop(cluster_id, None)
+        self.failed.discard(cluster_id)
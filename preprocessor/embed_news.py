@@ -0,0 +1,77 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from common.data_io import NEWS_PATH, EMBEDDINGS_DIR, read_frame
+from common.embeddings import DEFAULT_BACKEND, embed
+from common.metrics import metrics
+
+EMBEDDED_COLUMNS = ['url', 'cluster_id', 'headline', 'extracted_text', 'sentiment_score', 'sentiment_magnitude', 'entities',
+                    'heading', 'summary', 'summarized_at']
+# Leading characters of the article that go into its vector (headline + lede carry most of the signal)
+MAX_EMBED_CHARS = 4000
+
+
+def _representatives(df):
+    """One article per near-duplicate cluster."""
+    df = df.drop_duplicates(subset=['cluster_id']) if 'cluster_id' in df else df
+    return df.reset_index(drop=True)
+
+
+def _embed_frame(df, backend, batch_size):
+    texts = (df['headline'].fillna('') + '\n' + df['extracted_text'].fillna('').str.slice(0, MAX_EMBED_CHARS)).tolist()
+    batches = [embed(texts[i:i + batch_size], backend) for i in range(0, len(texts), batch_size)]
+    return np.vstack(batches).astype(np.float32) if batches else np.zeros((0, 0), dtype=np.float32)
+
+
+def _write_index(df, vectors, out_dir, backend):
+    """Write rows, info and vectors through temp files; vectors.npy goes last since readers reload on its mtime."""
+    os.makedirs(out_dir, exist_ok=True)
+    rows_path, info_path, vectors_path = (os.path.join(out_dir, name) for name in ('rows.parquet', 'info.json', 'vectors.npy'))
+    df[[column for column in EMBEDDED_COLUMNS if column in df]].to_parquet(rows_path + '.tmp', index=False)
+    with open(info_path + '.tmp', 'w') as f:
+        json.dump({'backend': backend, 'dim': int(vectors.shape[1]) if vectors.size else 0, 'rows': len(df)}, f)
+    with open(vectors_path + '.tmp', 'wb') as f:
+        np.save(f, vectors)
+    for path in (rows_path, info_path, vectors_path):
+        os.replace(path + '.tmp', path)
+
+
+@metrics.timed("etl.build_embedding_index")
+def build_embedding_index(news_path=NEWS_PATH, out_dir=EMBEDDINGS_DIR, backend=None, batch_size=256):
+    """Embed every article in `news_path` (one per near-duplicate cluster) into a memory-mappable matrix."""
+    backend = backend or DEFAULT_BACKEND
+    df = _representatives(read_frame(news_path))
+    vectors = _embed_frame(df, backend, batch_size)
+    _write_index(df, vectors, out_dir, backend)
+    return f'Embedded {len(df)} articles with "{backend}" into {out_dir}'
+
+
+@metrics.timed("etl.append_embeddings")
+def append_embeddings(df, out_dir=EMBEDDINGS_DIR, batch_size=256):
+    """
+    Add a freshly loaded chunk to the index in `out_dir` (streaming ETL and
+    ingest daemon). Only the chunk is embedded; clusters already in the index
+    drop their old row and vector and the new ones are appended. The existing
+    backend is kept so every vector in the matrix stays comparable.
+    """
+    df = _representatives(df)
+    if df.empty:
+        return 0
+    vectors_path = os.path.join(out_dir, 'vectors.npy')
+    if not os.path.exists(vectors_path):
+        _write_index(df, _embed_frame(df, DEFAULT_BACKEND, batch_size), out_dir, DEFAULT_BACKEND)
+        return len(df)
+    with open(os.path.join(out_dir, 'info.json')) as f:
+        backend = json.load(f)['backend']
+    rows = read_frame(os.path.join(out_dir, 'rows.parquet'))
+    vectors = np.load(vectors_path)
+    key = 'cluster_id' if 'cluster_id' in df and 'cluster_id' in rows else 'url'
+    stale = rows[key].isin(df[key]).to_numpy()
+    new_vectors = _embed_frame(df, backend, batch_size)
+    if len(rows) > stale.sum():
+        new_vectors = np.vstack([vectors[~stale], new_vectors])
+    _write_index(pd.concat([rows[~stale], df], ignore_index=True), new_vectors, out_dir, backend)
+    return len(df)
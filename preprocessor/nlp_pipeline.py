@@ -0,0 +1,140 @@
+import queue
+import random
+import threading
+import time
+
+from google.api_core import exceptions as google_exceptions
+
+from common.metrics import metrics
+
+# 429/ResourceExhausted plus the transient server-side errors worth retrying
+RATE_LIMIT_ERRORS = (google_exceptions.TooManyRequests,)
+TRANSIENT_ERRORS = (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+)
+
+_STOP = object()
+
+
+class QuotaExceeded(Exception):
+    """Raised when the per-run NLP request budget has been spent."""
+
+
+# Failures that say nothing about the article itself; it is worth analyzing again later
+RETRYABLE_ERRORS = RATE_LIMIT_ERRORS + TRANSIENT_ERRORS + (QuotaExceeded,)
+
+
+class RequestBudget:
+    """Thread-safe cap on NLP API calls, shareable by the pipelines of one run (e.g. every streaming chunk)."""
+
+    def __init__(self, max_requests=None):
+        self.max_requests = max_requests
+        self.spent = 0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        with self._lock:
+            if self.max_requests is not None and self.spent >= self.max_requests:
+                raise QuotaExceeded(f"NLP request budget of {self.max_requests} exhausted")
+            self.spent += 1
+
+
+class NLPPipeline:
+    """
+    Bounded pool of NLP workers fed from a queue.
+
+    The scraping stage `submit`s cleaned text and moves on; `max_workers`
+    threads drain the queue and call `analyze(text)`. A 429 from the API
+    pauses every worker (shared cooldown) before retrying with jittered
+    exponential backoff, and `max_requests` caps the API calls spent in a run.
+    Pass a shared `budget` instead to cap several pipelines together.
+    """
+
+    def __init__(self, analyze, max_workers=8, max_requests=None, retries=5,
+                 backoff_base=1.0, backoff_cap=32.0, queue_size=0, budget=None):
+        self.analyze = analyze
+        self.max_workers = max_workers
+        self.budget = budget or RequestBudget(max_requests)
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.requests_made = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+        self._cooldown_until = 0.0
+        self._threads = []
+
+    def start(self):
+        for i in range(self.max_workers):
+            thread = threading.Thread(target=self._worker, name=f"nlp-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, key, text, callback):
+        """Queue `text`; `callback(key, insights, error)` runs on a worker thread when done."""
+        self.queue.put((key, text, callback))
+
+    def close(self):
+        """Wait for queued work (including work submitted from callbacks) to finish and stop the workers."""
+        self.queue.join()
+        for _ in self._threads:
+            self.queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _worker(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                self.queue.task_done()
+                return
+            key, text, callback = item
+            try:
+                insights, error = self._call(text), None
+            except Exception as e:
+                insights, error = None, e
+                metrics.incr("nlp.errors", error=type(e).__name__)
+            try:
+                callback(key, insights, error)
+            finally:
+                self.queue.task_done()
+
+    def _reserve_request(self):
+        self.budget.reserve()
+        with self._lock:
+            self.requests_made += 1
+        metrics.incr("nlp.requests")
+
+    def _wait_for_cooldown(self):
+        delay = self._cooldown_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _call(self, text):
+        for attempt in range(self.retries + 1):
+            self._wait_for_cooldown()
+            self._reserve_request()
+            try:
+                return self.analyze(text)
+            except RATE_LIMIT_ERRORS + TRANSIENT_ERRORS as e:
+                if attempt == self.retries:
+                    raise
+                delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+                if isinstance(e, RATE_LIMIT_ERRORS):
+                    with self._lock:
+                        self.rate_limited += 1
+                        self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+                    metrics.incr("nlp.rate_limited")
+                else:
+                    time.sleep(delay)
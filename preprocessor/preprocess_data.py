@@ -1,131 +1,255 @@
-from google.cloud import language_v1
-import requests
 import pandas as pd
-from newspaper import Article
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import traceback
+from common import backends
+from common.metrics import metrics
+from .async_fetcher import AsyncFetcher
+from .nlp_pipeline import NLPPipeline, RequestBudget, RETRYABLE_ERRORS
+from .data_merger import RETRY_ERROR_PREFIX
+from .cache import ContentCache, text_hash
+from .dedup import NearDuplicateIndex, cluster_key
+from .html_extract import HtmlExtractor, parse_article
+from common.data_io import RAW_NEWS_PATH, PREPROCESSED_NEWS_PATH, PREPROCESSED_NEWS_SCHEMA, read_frame, write_frame
+
+OUTPUT_COLUMNS = PREPROCESSED_NEWS_SCHEMA.names
+# One annotateText call covers what used to be three separate round trips
+ANNOTATE_FEATURES = {
+    'extract_entities': True,
+    'extract_document_sentiment': True,
+    'classify_text': True,
+}
+# Bump when the shape of analyze_text_content's output changes so old cache entries are ignored
+ANNOTATION_VERSION = 'annotate-v2'
+# Cloud NLP Entity.Type values kept as an article's main entities
+MAIN_ENTITY_TYPES = {1: 'PERSON', 2: 'LOCATION', 3: 'ORGANIZATION', 4: 'EVENT', 5: 'WORK_OF_ART', 6: 'CONSUMER_GOOD'}
+MAX_ENTITIES = 20
 
 class GCPContentPreprocessor:
-    def __init__(self):
-        self.nlp_client = language_v1.LanguageServiceClient()
+    def __init__(self, nlp_client=None, cache=None, extractor=None):
+        # Any object exposing `annotate_text(request=...)` works, e.g. a fake NLP service in tests
+        # The default LanguageServiceClient is created (and google.cloud.language imported) on first use
+        self._nlp_client = nlp_client
+        self.cache = cache
+        # An HtmlExtractor parses pages in worker processes; without one they are parsed in the calling thread
+        self.extractor = extractor
         self.article_count = 1
 
-    def process_webpage(self, url):
-        # Always return 5 items! (url, extracted_text, sentiment, entities, category)
-        error_return = pd.Series(
-            [url, "ERROR", "ERROR", "ERROR", "ERROR"],
-            index=['url', 'extracted_text', 'sentiment', 'entities', 'detailed_category']
-        )
+    @property
+    def nlp_client(self):
+        if self._nlp_client is None:
+            self._nlp_client = backends.get("language")
+        return self._nlp_client
+
+    def extract_text(self, url, page=None):
+        """Return the cleaned article text, or an error row (pd.Series) if the page is unusable."""
+        error_return = error_row(url, "ERROR")
         try:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-            }
-            response = requests.get(url, headers=headers, timeout=15)
-            if response.status_code != 200:
-                err = f"Failed to fetch page: {response.status_code}"
+            if page is None:
+                page = AsyncFetcher(retries=0, cache=self.cache).fetch_all([url])[0]
+            if page.status is None:
+                print(f"{url}: {page.error}")
+                metrics.incr("extract.errors", reason="fetch")
+                return error_return
+            if page.status != 200:
+                err = f"Failed to fetch page: {page.status}"
                 print(f"{url}: {err}")
-                return pd.Series(
-                    [url, err, err, err, err],
-                    index=['url', 'extracted_text', 'sentiment', 'entities', 'detailed_category']
-                )
-            article = Article(url)
-            article.download(input_html=response.text)
-            article.parse()
-            clean_text = article.text.strip()
-            # Heuristic: paywalled/restricted content or too short
-            short_flag = (
-                not clean_text
-                or len(clean_text.split()) < 30
-                or any(kw in clean_text.lower() for kw in [
-                    "subscribe", "sign in", "registration required",
-                    "become a member", "this content is for subscribers"
-                ])
-            )
+                metrics.incr("extract.errors", reason=f"http_{page.status}")
+                return error_row(url, err)
+            if self.extractor is not None:
+                clean_text, short_flag, parse_seconds = self.extractor.extract(url, page.text)
+            else:
+                clean_text, short_flag, parse_seconds = parse_article(url, page.text)
+            # Per-article timing only; a span (and event) per page would be too chatty
+            metrics.observe("extract.parse", parse_seconds)
             if short_flag:
                 err = "Content too short or access restricted"
                 print(f"{url}: {err}")
-                return pd.Series(
-                    [url, err, err, err, err],
-                    index=['url', 'extracted_text', 'sentiment', 'entities', 'detailed_category']
-                )
-            try:
-                # Analyze content using GCP NLP API
-                text_insights = self.analyze_text_content(clean_text)
-                text_insights['extracted_text'] = clean_text
-            except Exception as e:
-                print(f"{url}: GCP NLP error\n{traceback.format_exc()}")
-                err = f"GCP NLP ERROR: {e}"
-                return pd.Series(
-                    [url, clean_text, err, err, err],
-                    index=['url', 'extracted_text', 'sentiment', 'entities', 'detailed_category']
-                )
-            print(f"Article {self.article_count} extraction complete")
-            self.article_count += 1
-            return pd.Series(
-                [url, text_insights['extracted_text'], text_insights['sentiment'],
-                 text_insights['entities'], text_insights['detailed_category']],
-                index=['url', 'extracted_text', 'sentiment', 'entities', 'detailed_category']
-            )
+                metrics.incr("extract.errors", reason="too_short_or_restricted")
+                return error_row(url, err)
+            metrics.incr("extract.ok")
+            return clean_text
         except Exception as e:
             print(f"{url}: {e}\n{traceback.format_exc()}")
+            metrics.incr("extract.errors", reason=type(e).__name__)
             return error_return
 
+    def build_row(self, url, clean_text, text_insights=None, error=None, cluster_id=None):
+        """Turn NLP output (or the NLP error) for an article into a result row."""
+        cluster_id = cluster_id or cluster_key(clean_text)
+        if error is not None:
+            print(f"{url}: GCP NLP error\n{''.join(traceback.format_exception(error))}")
+            prefix = RETRY_ERROR_PREFIX if isinstance(error, RETRYABLE_ERRORS) else "GCP NLP ERROR"
+            return pd.Series({'url': url, 'extracted_text': clean_text, 'cluster_id': cluster_id,
+                              'error': f"{prefix}: {error}"}, index=OUTPUT_COLUMNS)
+        print(f"Article {self.article_count} extraction complete")
+        self.article_count += 1
+        return pd.Series({'url': url, 'extracted_text': clean_text, 'cluster_id': cluster_id, **text_insights},
+                         index=OUTPUT_COLUMNS)
+
+    def process_webpage(self, url, page=None):
+        # Always return the full row (OUTPUT_COLUMNS); `error` is set when the article is unusable
+        # `page` is a FetchResult from the async fetch stage; fetched on demand when omitted
+        clean_text = self.extract_text(url, page)
+        if isinstance(clean_text, pd.Series):
+            return clean_text
+        try:
+            # Analyze content using GCP NLP API
+            return self.build_row(url, clean_text, self.analyze_text_content(clean_text))
+        except Exception as e:
+            return self.build_row(url, clean_text, error=e)
+
+    def cached_insights(self, text):
+        if self.cache is None:
+            return None
+        return self.cache.get_nlp(text_hash(text, ANNOTATION_VERSION))
+
     def analyze_text_content(self, text):
-        document = language_v1.Document(
-            content=text, type_=language_v1.Document.Type.PLAIN_TEXT
-        )
-        sentiment_info = self.nlp_client.analyze_sentiment(
-            request={'document': document}
-        ).document_sentiment
-        sentiment = f"Sentiment score {sentiment_info.score} , Sentiment Magnitude {sentiment_info.magnitude}"
-        entities_resp = self.nlp_client.analyze_entities(request={'document': document})
-        entities = entities_resp.entities if hasattr(entities_resp, 'entities') else []
-        if entities:
-            entities = sorted(entities, key=lambda x: x.salience, reverse=True)
-            MAIN_ENTITY_TYPES = {1, 2, 3, 4, 5, 6}
-            entities_info = {}
-            for entity in entities:
-                if entity.type_ in MAIN_ENTITY_TYPES and entity.name.lower() not in entities_info:
-                    entities_info[entity.name] = entity
-            top_main_entities = list(entities_info.values())[:20]
-            entities_str = ', '.join(
-                [f"name:{entity.name} type: {entity.type_} Salience {entity.salience}" for entity in top_main_entities]
-            )
-        else:
-            entities_str = 'None'
-        classification = self.nlp_client.classify_text(request={'document': document})
-        if hasattr(classification, 'categories') and classification.categories:
-            category_info = sorted(classification.categories, key=lambda x: x.confidence, reverse=True)[0]
-            category = f"Category:{category_info.name} , Category_confidence:{round(category_info.confidence*100,2)}%"
-        else:
-            category = 'Category:None , Category_confidence:0%'
+        text_insights = self.cached_insights(text)
+        if text_insights is None:
+            text_insights = self.annotate_and_cache(text)
+        return text_insights
+
+    def annotate_and_cache(self, text):
+        """NLP call for text already known to be missing from the cache."""
+        text_insights = self._annotate(text)
+        if self.cache is not None:
+            self.cache.put_nlp(text_hash(text, ANNOTATION_VERSION), text_insights)
+        return text_insights
+
+    def _annotate(self, text):
+        response = self.nlp_client.annotate_text(request={
+            # Enum by name, so this module does not need to import google.cloud.language
+            'document': {'content': text, 'type_': 'PLAIN_TEXT'},
+            'features': ANNOTATE_FEATURES,
+        })
+        sentiment_info = response.document_sentiment
+        entities = response.entities if hasattr(response, 'entities') else []
+        main_entities = {}
+        for entity in sorted(entities, key=lambda x: x.salience, reverse=True):
+            entity_type = MAIN_ENTITY_TYPES.get(int(entity.type_))
+            if entity_type and entity.name.lower() not in main_entities:
+                main_entities[entity.name.lower()] = {
+                    'name': entity.name, 'type': entity_type, 'salience': round(float(entity.salience), 4)}
+        category_name, category_confidence = None, None
+        if hasattr(response, 'categories') and response.categories:
+            category_info = sorted(response.categories, key=lambda x: x.confidence, reverse=True)[0]
+            category_name, category_confidence = category_info.name, round(float(category_info.confidence), 4)
         return {
-            'sentiment': sentiment,
-            'entities': entities_str,
-            'detailed_category': category
+            'sentiment_score': float(sentiment_info.score),
+            'sentiment_magnitude': float(sentiment_info.magnitude),
+            'entities': list(main_entities.values())[:MAX_ENTITIES],
+            'detailed_category': category_name,
+            'category_confidence': category_confidence,
         }
 
-def parallel_apply(urls, func, max_workers=15):
+def error_row(url, err):
+    # Always return full error shape
+    return pd.Series({'url': url, 'error': err}, index=OUTPUT_COLUMNS)
+
+def run_pipeline(preprocess_object, urls, fetcher=None, parse_workers=4, nlp_workers=8, nlp_max_requests=None,
+                 dedup_index=None, nlp_budget=None):
+    """
+    Fetch -> parse -> near-duplicate clustering -> NLP, with the NLP stage behind its own queue and worker pool.
+
+    Pages are parsed as soon as the fetcher hands them over and the cleaned
+    text is queued for NLP, so slow NLP calls never hold up downloads and
+    slow downloads never leave the NLP workers idle. Only one representative
+    per near-duplicate cluster is analyzed; its insights are copied to the
+    other members. Pass a shared `dedup_index` to cluster across calls, and a
+    shared `nlp_budget` (RequestBudget) to cap NLP calls across them.
+    """
+    if preprocess_object.extractor is not None:
+        # Parse threads only wait on the worker processes; keep at least one per process busy
+        parse_workers = max(parse_workers, preprocess_object.extractor.max_workers)
     results = []
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_url = {executor.submit(func, url): url for url in urls}
-        for future in as_completed(future_to_url):
-            try:
-                results.append(future.result())
-            except Exception as e:
-                # Always return full error shape
-                results.append(
-                    pd.Series(
-                        [future_to_url[future], "ERROR", "ERROR", "ERROR", "ERROR"],
-                        index=['url', 'extracted_text', 'sentiment', 'entities', 'detailed_category']
-                    )
-                )
+    results_lock = threading.Lock()
+    dedup_index = dedup_index if dedup_index is not None else NearDuplicateIndex()
+    waiting = {}  # cluster id -> [(url, clean_text)] copies waiting on their representative's NLP result
+    duplicates = 0
+
+    def collect(row):
+        with results_lock:
+            results.append(row)
+
+    def analyze(url, clean_text, cluster_id, is_representative=True):
+        # Unchanged text was analyzed on an earlier run: skip the NLP queue (and its budget) entirely
+        text_insights = preprocess_object.cached_insights(clean_text)
+        if text_insights is not None:
+            on_nlp_done((url, clean_text, cluster_id, is_representative), text_insights, None)
+        else:
+            # The miss is already counted: the worker goes straight to the NLP call
+            nlp.submit((url, clean_text, cluster_id, is_representative), clean_text, on_nlp_done)
+
+    def on_nlp_done(key, text_insights, error):
+        url, clean_text, cluster_id, is_representative = key
+        collect(preprocess_object.build_row(url, clean_text, text_insights, error, cluster_id))
+        if not is_representative:
+            return
+        with dedup_index.lock:
+            # Skip clusters evicted while their representative was in flight
+            tracked = cluster_id in dedup_index.signatures
+            if tracked and error is None:
+                dedup_index.results[cluster_id] = text_insights
+            elif tracked:
+                dedup_index.failed.add(cluster_id)
+            copies = waiting.pop(cluster_id, [])
+        for copy_url, copy_text in copies:
+            if error is None:
+                collect(preprocess_object.build_row(copy_url, copy_text, text_insights, cluster_id=cluster_id))
+            else:
+                # The representative failed; give each copy its own attempt
+                analyze(copy_url, copy_text, cluster_id, is_representative=False)
+
+    def parse(page):
+        nonlocal duplicates
+        clean_text = preprocess_object.extract_text(page.url, page)
+        if isinstance(clean_text, pd.Series):
+            collect(clean_text)
+            return
+        cluster_id, is_representative = dedup_index.add(clean_text)
+        if is_representative:
+            analyze(page.url, clean_text, cluster_id)
+            return
+        with dedup_index.lock:
+            duplicates += 1
+            text_insights = dedup_index.results.get(cluster_id)
+            representative_failed = cluster_id in dedup_index.failed
+            if text_insights is None and not representative_failed:
+                # Representative still in flight: its completion fans the result out to us
+                waiting.setdefault(cluster_id, []).append((page.url, clean_text))
+                return
+        if text_insights is not None:
+            collect(preprocess_object.build_row(page.url, clean_text, text_insights, cluster_id=cluster_id))
+        else:
+            analyze(page.url, clean_text, cluster_id, is_representative=False)
+
+    nlp = NLPPipeline(preprocess_object.annotate_and_cache, max_workers=nlp_workers,
+                      budget=nlp_budget or RequestBudget(nlp_max_requests))
+    with nlp:
+        with ThreadPoolExecutor(max_workers=parse_workers) as parse_pool:
+            (fetcher or AsyncFetcher(cache=preprocess_object.cache)).fetch_all(urls, on_result=lambda page: parse_pool.submit(parse, page))
+    print(f"NLP requests made: {nlp.requests_made} (rate limited {nlp.rate_limited} times), near-duplicates reused: {duplicates}")
+    metrics.incr("dedup.reused", duplicates)
     return results
 
-def extract_and_preprocess():
-    preprocess_object = GCPContentPreprocessor()
-    news_df = pd.read_csv('./data/raw_news.csv')
-    results = parallel_apply(news_df['url'], preprocess_object.process_webpage, max_workers=15)
-    results_df = pd.DataFrame(results, columns=['url','extracted_text','sentiment','entities','detailed_category'])
-    results_df.to_csv('./data/preprocessed_news.csv', index=False)
-    return 'Preprocessed and data stored in ./data/preprocessed_news.csv'
+@metrics.timed("etl.extract_and_preprocess")
+def extract_and_preprocess(nlp_workers=8, nlp_max_requests=None, use_cache=True, export_csv=False, parse_processes=None):
+    """parse_processes: HTML parsing processes (None = one per available core, 0 = parse in threads)."""
+    cache = ContentCache() if use_cache else None
+    extractor = HtmlExtractor(parse_processes) if parse_processes != 0 else None
+    preprocess_object = GCPContentPreprocessor(cache=cache, extractor=extractor)
+    news_df = read_frame(RAW_NEWS_PATH, columns=['url'])
+    try:
+        results = run_pipeline(preprocess_object, news_df['url'], nlp_workers=nlp_workers, nlp_max_requests=nlp_max_requests)
+    finally:
+        if extractor is not None:
+            extractor.close()
+    if cache is not None:
+        print(f"Cache: {cache.summary()}")
+        for name, value in cache.stats.items():
+            metrics.incr(f"cache.{name}", value)
+        cache.close()
+    results_df = pd.DataFrame(results, columns=OUTPUT_COLUMNS)
+    write_frame(results_df, PREPROCESSED_NEWS_PATH, PREPROCESSED_NEWS_SCHEMA, export_csv=export_csv)
+    return f'Preprocessed and data stored in {PREPROCESSED_NEWS_PATH}'
@@ -0,0 +1,132 @@
+import resource
+import sys
+from itertools import islice
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from common import backends
+from common.metrics import metrics
+from common.data_io import NEWS_PATH, EMBEDDINGS_DIR, NEWS_SCHEMA, RAW_NEWS_SCHEMA, PREPROCESSED_NEWS_SCHEMA, conform_frame
+from .cache import ContentCache
+from .data_merger import merge_and_filter, retryable_rows
+from .dedup import NearDuplicateIndex
+from .embed_news import append_embeddings
+from .html_extract import HtmlExtractor
+from .nlp_pipeline import RequestBudget
+from .summarize import summarize_frame
+from .preprocess_data import GCPContentPreprocessor, run_pipeline
+
+
+def peak_rss_mb(include_children=False):
+    """
+    Peak resident set size of this process so far, in MB. `include_children` adds the
+    largest finished child process (e.g. a parse worker of a closed HtmlExtractor).
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if include_children:
+        peak += resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def iter_processed_chunks(records, preprocess_object, chunk_size=200, summarize=False, on_retryable=None,
+                          **pipeline_kwargs):
+    """
+    Scrape, analyze and filter `records` ({category, headline, url} dicts) `chunk_size` at a time.
+
+    Yields one merged, error-free DataFrame (NEWS_SCHEMA columns) per chunk,
+    so only a single chunk of articles is held in memory at once. One
+    near-duplicate index spans all chunks so a story syndicated across
+    chunks is still analyzed once. With `summarize`, each chunk also gets
+    its precomputed heading/summary before it is flushed. `on_retryable(urls)`
+    is called with a chunk's articles whose NLP call failed on quota, rate
+    limits or a transient error (they are not in the yielded frame).
+    `nlp_max_requests` caps the NLP calls of the whole stream, not of each chunk.
+    """
+    dedup_index = NearDuplicateIndex()
+    nlp_budget = RequestBudget(pipeline_kwargs.pop('nlp_max_requests', None))
+    for raw_chunk in chunked(records, chunk_size):
+        raw_df = pd.DataFrame(raw_chunk, columns=RAW_NEWS_SCHEMA.names)
+        rows = run_pipeline(preprocess_object, raw_df['url'], dedup_index=dedup_index, nlp_budget=nlp_budget,
+                            **pipeline_kwargs)
+        preprocessed_df = pd.DataFrame(rows, columns=PREPROCESSED_NEWS_SCHEMA.names)
+        retry = preprocessed_df.loc[retryable_rows(preprocessed_df), 'url'].tolist()
+        if retry and on_retryable is not None:
+            on_retryable(retry)
+        chunk_df = conform_frame(merge_and_filter(raw_df, preprocessed_df), NEWS_SCHEMA)
+        if summarize:
+            chunk_df = summarize_frame(chunk_df, cache=preprocess_object.cache)
+        yield len(raw_df), chunk_df
+
+
+class ParquetSink:
+    """Append each chunk as a row group of a single Parquet file."""
+
+    def __init__(self, path=NEWS_PATH, schema=NEWS_SCHEMA):
+        self.path = path
+        self.schema = schema
+        self._writer = None
+
+    def write(self, df):
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, self.schema, compression='zstd')
+        self._writer.write_table(pa.Table.from_pandas(conform_frame(df, self.schema), schema=self.schema, preserve_index=False))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        return self.path
+
+
+class BigQuerySink:
+    """MERGE each chunk into news_data as soon as it is ready."""
+
+    def __init__(self, client=None):
+        self.client = client or backends.get("bigquery")
+
+    def write(self, df):
+        from .data_insert import load_incremental_frame  # google.cloud.bigquery, only once a chunk is loaded
+        print(load_incremental_frame(df, client=self.client))
+
+    def close(self):
+        return 'news_data'
+
+
+@metrics.timed("etl.streaming")
+def run_streaming_etl(records, sink, chunk_size=200, preprocess_object=None, summarize=False,
+                      embeddings_dir=EMBEDDINGS_DIR, **pipeline_kwargs):
+    """
+    Push `records` through scrape -> NLP -> filter -> `sink` one chunk at a time.
+    Each loaded chunk is also added to the semantic-search vectors in
+    `embeddings_dir` (None skips it).
+    """
+    # The default preprocessor (HTML process pool and content cache) lives for the whole stream
+    owned = preprocess_object is None
+    preprocess_object = preprocess_object or GCPContentPreprocessor(cache=ContentCache(), extractor=HtmlExtractor())
+    seen = kept = chunks = 0
+    try:
+        for chunk_size_in, chunk_df in iter_processed_chunks(records, preprocess_object, chunk_size, summarize, **pipeline_kwargs):
+            chunks += 1
+            seen += chunk_size_in
+            kept += len(chunk_df)
+            if not chunk_df.empty:
+                sink.write(chunk_df)
+                if embeddings_dir:
+                    append_embeddings(chunk_df, embeddings_dir)
+            print(f"Chunk {chunks}: {len(chunk_df)}/{chunk_size_in} rows flushed, peak RSS {peak_rss_mb():.1f} MB")
+            metrics.incr("stream.chunks")
+            metrics.incr("stream.rows", len(chunk_df))
+    finally:
+        if owned:
+            preprocess_object.extractor.close()
+            preprocess_object.cache.close()
+    destination = sink.close()
+    return f"Streamed {kept}/{seen} articles in {chunks} chunks to {destination}; peak RSS {peak_rss_mb():.1f} MB"
@@ -0,0 +1,83 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from common.data_io import NEWS_PATH, NEWS_SCHEMA, SUMMARY_MAX_AGE, conform_frame, read_frame, write_frame
+from common.metrics import metrics
+from .cache import ContentCache, text_hash
+
+# Bump when the summarizer prompt changes so cached summaries are regenerated
+SUMMARY_VERSION = 'summary-v1'
+
+
+def _is_stale(summarized_at, now):
+    return pd.isna(summarized_at) or now - pd.Timestamp(summarized_at).timestamp() > SUMMARY_MAX_AGE
+
+
+def _needs_summary(row, now):
+    return not row.get('summary') or _is_stale(row.get('summarized_at'), now)
+
+
+def summarize_frame(df, chain=None, cache=None, max_workers=4):
+    """
+    Fill heading/summary/summarized_at for rows without a fresh summary.
+
+    Each article is summarized once per distinct text (the result is cached by
+    content hash), with at most `max_workers` concurrent LLM calls.
+    """
+    # langchain and the agents package are only needed when this optional stage runs
+    from langchain_core.messages import HumanMessage
+    from agents.llm_chains import format_article, get_news_summarizer_chain
+    chain = chain or get_news_summarizer_chain()
+    df = conform_frame(df, NEWS_SCHEMA).copy()
+    now = time.time()
+    todo = [index for index, row in df.iterrows() if _needs_summary(row, now)]
+
+    def summarize(index):
+        article = format_article(df.loc[index])
+        key = text_hash(article, SUMMARY_VERSION)
+        cached = cache.get_nlp(key) if cache is not None else None
+        # A cached summary past the age limit is regenerated, or it would be re-emitted stale forever
+        if cached is not None and not _is_stale(cached.get('summarized_at'), now):
+            metrics.incr("summaries.cached")
+            return index, cached
+        try:
+            output = chain.invoke({"messages": [HumanMessage(content=article)]})
+        except Exception as e:
+            print(f"{df.at[index, 'url']}: summary failed: {e}")
+            metrics.incr("summaries.errors", error=type(e).__name__)
+            return index, None
+        result = {
+            'heading': output.heading,
+            'summary': output.summary,
+            'summarized_at': datetime.now(timezone.utc).isoformat(),
+        }
+        if cache is not None:
+            cache.put_nlp(key, result)
+        return index, result
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for index, result in executor.map(summarize, todo):
+            if result is None:
+                continue
+            df.at[index, 'heading'] = result['heading']
+            df.at[index, 'summary'] = result['summary']
+            df.at[index, 'summarized_at'] = pd.Timestamp(result['summarized_at'])
+            done += 1
+    df['summarized_at'] = pd.to_datetime(df['summarized_at'], utc=True)
+    print(f"Summaries: {done}/{len(todo)} generated or reused, {len(df) - len(todo)} already fresh")
+    return df
+
+
+@metrics.timed("etl.precompute_summaries")
+def precompute_summaries(news_path=NEWS_PATH, max_workers=4, use_cache=True):
+    """Optional ETL stage after combine_data: store a heading/summary with every article."""
+    cache = ContentCache() if use_cache else None
+    df = summarize_frame(read_frame(news_path), cache=cache, max_workers=max_workers)
+    if cache is not None:
+        cache.close()
+    write_frame(df, news_path, NEWS_SCHEMA)
+    return f'Summaries stored in {news_path}'
@@ -0,0 +1,20 @@
+import os
+
+import pandas as pd
+
+from common.data_io import PREPROCESSED_NEWS_SCHEMA, read_frame, write_frame
+from preprocessor.preprocess_data import OUTPUT_COLUMNS, error_row
+
+
+def test_write_frame_accepts_a_batch_where_every_row_failed(tmp_path):
+    # Every fetch failed, so entities is an all-NaN float64 column
+    df = pd.DataFrame([error_row("https://unreachable.invalid/a", "ERROR"),
+                       error_row("https://unreachable.invalid/b", "ERROR")], columns=OUTPUT_COLUMNS)
+    assert df["entities"].dtype == "float64"
+
+    path = write_frame(df, os.path.join(tmp_path, "preprocessed.parquet"), PREPROCESSED_NEWS_SCHEMA, export_csv=True)
+
+    out = read_frame(path)
+    assert out["url"].tolist() == df["url"].tolist()
+    assert out["entities"].isna().all()
+    assert out["error"].tolist() == ["ERROR", "ERROR"]
@@ -0,0 +1,50 @@
+import time
+
+import pytest
+
+from benchmarks import fakes
+
+
+class ListSink:
+    def __init__(self):
+        self.urls = []
+
+    def write(self, df):
+        self.urls.extend(df["url"])
+
+    def close(self):
+        return "list"
+
+
+@pytest.fixture
+def site():
+    site = fakes.FakeNewsSite().start()
+    yield site
+    site.stop()
+
+
+def test_due_recrawl_reaches_the_network(site, tmp_path, monkeypatch):
+    # The daemon's own page cache and checkpoint live under ./data
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    monkeypatch.setenv("SERPAPI_api_key", "test")
+    fakes.install()
+    from ingest_daemon import IngestDaemon
+
+    sink = ListSink()
+    daemon = IngestDaemon(categories={"AI": "ai"}, intervals={"AI": 0}, sink=sink, session=fakes.FakeSerpApi(site, per_query=3),
+                          recrawl_after=0.5, max_batch_delay=0, summarize=False, embeddings_dir=None)
+    try:
+        daemon.poll_due(time.time())
+        assert daemon.process_batch(time.time())
+        assert site.requests == 3
+
+        time.sleep(0.6)
+        daemon.poll_due(time.time())
+        assert daemon.checkpoint.pending_count() == 3
+        assert daemon.process_batch(time.time())
+    finally:
+        daemon.close()
+
+    assert site.requests == 6
+    assert len(sink.urls) == 6
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from benchmarks import fakes
+from preprocessor.cache import ContentCache
+from preprocessor.preprocess_data import GCPContentPreprocessor, run_pipeline
+
+
+@pytest.fixture
+def site():
+    site = fakes.FakeNewsSite().start()
+    yield site
+    site.stop()
+
+
+def test_each_nlp_cache_miss_is_counted_once(site, tmp_path):
+    nlp = fakes.FakeNLPClient()
+    cache = ContentCache(os.path.join(tmp_path, "cache.sqlite"))
+    urls = [site.url(n) for n in range(30)]
+
+    run_pipeline(GCPContentPreprocessor(nlp_client=nlp, cache=cache), urls)
+
+    assert nlp.calls > 0
+    assert cache.stats["nlp_misses"] == nlp.calls
+    assert cache.stats["nlp_hits"] == 0
+
+    # A rerun over the same pages is answered from the cache
+    run_pipeline(GCPContentPreprocessor(nlp_client=nlp, cache=cache), urls)
+    assert cache.stats["nlp_misses"] == nlp.calls
+    cache.close()
+
+
+def test_nlp_request_budget_spans_every_chunk_of_a_stream(site):
+    from preprocessor.streaming import iter_processed_chunks
+
+    nlp = fakes.FakeNLPClient()
+    records = [{"category": "AI", "headline": f"Headline {n}", "url": site.url(n), "categories": ["AI"]} for n in range(30)]
+
+    retry = []
+    chunks = list(iter_processed_chunks(records, GCPContentPreprocessor(nlp_client=nlp), chunk_size=10,
+                                        on_retryable=retry.extend, nlp_max_requests=5))
+
+    assert len(chunks) == 3
+    assert nlp.calls == 5
+    assert sum(len(chunk_df) for _, chunk_df in chunks) == 5
+    assert len(retry) > 10
@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from agents.scheduler import BudgetExceeded, WorkerScheduler, estimate_tokens, select_sections
+
+
+def test_identical_keys_in_flight_share_one_call():
+    scheduler = WorkerScheduler(max_concurrency=2)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def summarize():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "summary"
+
+    results = []
+    owner = threading.Thread(target=lambda: results.append(scheduler.run("same", summarize)))
+    owner.start()
+    started.wait(5)
+    waiter = threading.Thread(target=lambda: results.append(scheduler.run("same", summarize)))
+    waiter.start()
+    while scheduler.coalesced == 0:
+        time.sleep(0.01)
+    release.set()
+    owner.join(5)
+    waiter.join(5)
+
+    assert results == ["summary", "summary"]
+    assert len(calls) == 1
+    assert scheduler.stats()["coalesced"] == 1
+
+
+def test_token_budget_keeps_the_most_salient_rows():
+    rows = [{"text": "x" * 400, "entities": [{"name": "A", "type": "ORG", "salience": s}]} for s in (0.1, 0.9, 0.5)]
+    render = lambda row: row["text"]
+
+    kept, dropped = select_sections(rows, render, token_budget=2 * estimate_tokens("x" * 400))
+
+    assert dropped == 1
+    assert [(priority, row["entities"][0]["salience"]) for priority, row in kept] == [(0, 0.9), (1, 0.5)]
+
+
+def test_section_without_a_slot_before_the_deadline_is_dropped():
+    scheduler = WorkerScheduler(max_concurrency=1)
+    started, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=lambda: scheduler.run("a", lambda: (started.set(), release.wait(5))))
+    holder.start()
+    started.wait(5)
+
+    with pytest.raises(BudgetExceeded):
+        scheduler.run("b", lambda: "late", deadline=time.time() + 0.1)
+    release.set()
+    holder.join(5)
+
+    assert scheduler.stats()["dropped"] == 1
+
+
+def test_cooldown_before_a_retry_honors_the_deadline():
+    # The first backoff is up to 30s; the request only has half a second left
+    scheduler = WorkerScheduler(backoff_base=30.0, backoff_cap=30.0)
+    scheduler._cooldown_until = time.monotonic() + 10
+
+    started = time.monotonic()
+    with pytest.raises(BudgetExceeded):
+        scheduler.run("a", lambda: "never", deadline=time.time() + 0.5)
+
+    assert time.monotonic() - started < 0.5
+    assert scheduler.calls == 0
+
+
+def test_rate_limited_call_fails_fast_when_the_backoff_outlasts_the_deadline(monkeypatch):
+    monkeypatch.setattr("agents.scheduler.random.uniform", lambda low, high: high)
+    scheduler = WorkerScheduler(backoff_base=30.0, backoff_cap=30.0)
+
+    def rate_limited():
+        raise google_exceptions.ResourceExhausted("429")
+
+    started = time.monotonic()
+    with pytest.raises(BudgetExceeded):
+        scheduler.run("a", rate_limited, deadline=time.time() + 1)
+
+    assert time.monotonic() - started < 1
+    assert scheduler.stats() == {"calls": 1, "coalesced": 0, "rate_limited": 1, "dropped": 1}
@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from benchmarks import fakes, scenarios
+from common.data_io import NEWS_SCHEMA, write_frame
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    """The real graph over a small news snapshot, with the fake LLM taking 50ms per call."""
+    monkeypatch.delenv("PROJECT_ID", raising=False)
+    installed = fakes.install(llm=fakes.FakeLLM(fakes.Profile(latency=0.05)))
+    from agents import cache
+    from agents.tools import toolkit
+
+    monkeypatch.setattr(toolkit, "index_path",
+                        write_frame(scenarios.synthetic_news(50), os.path.join(tmp_path, "news.parquet"), NEWS_SCHEMA))
+    monkeypatch.setattr(toolkit, "embeddings_dir", str(tmp_path))
+    monkeypatch.setattr(toolkit, "index", None)
+    for level in (cache.decision_cache, cache.retrieval_cache, cache.summary_cache, cache.response_cache.entries):
+        level.clear()
+    return installed
+
+
+def test_stream_events_order_and_time_to_first_section(agent):
+    from agents import stream_events
+
+    events = [event for event in stream_events({"messages": ["What is the latest news about OpenAI?"]})
+              if event["event"] != "token"]
+    kinds = [event["event"] for event in events]
+
+    assert kinds[:2] == ["decision", "headlines"]
+    assert kinds[-1] == "report"
+    assert set(kinds[2:-1]) == {"section"} and len(kinds) > 3
+    assert events[0]["query_term"] == "OpenAI"
+    report = events[-1]
+    assert report["cached"] is False
+    assert report["sections"] == len(kinds) - 3
+    assert 0 < report["time_to_first_section"] < report["elapsed"]
+    assert [event["elapsed"] for event in events] == sorted(event["elapsed"] for event in events)
+
+
+def test_stream_events_repeat_conversation_is_served_from_cache(agent):
+    from agents import stream_events
+
+    question = {"messages": ["What is the latest news about OpenAI?"]}
+    first = list(stream_events(question))[-1]
+    calls = agent["llm"].calls
+    repeat = list(stream_events(question))
+
+    assert [event["event"] for event in repeat] == ["report"]
+    assert repeat[0]["cached"] is True
+    assert repeat[0]["report"] == first["report"]
+    assert agent["llm"].calls == calls
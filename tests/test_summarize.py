@@ -0,0 +1,37 @@
+import os
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from agents.llm_chains import format_article
+from benchmarks import scenarios
+from common.data_io import NEWS_SCHEMA, SUMMARY_MAX_AGE, conform_frame
+from preprocessor.cache import ContentCache, text_hash
+from preprocessor.summarize import SUMMARY_VERSION, summarize_frame
+
+
+class CountingChain:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, inputs):
+        self.calls += 1
+        return SimpleNamespace(heading="Fresh heading", summary="Fresh summary")
+
+
+def test_stale_cached_summary_is_regenerated(tmp_path):
+    df = conform_frame(scenarios.synthetic_news(2), NEWS_SCHEMA)
+    cache = ContentCache(os.path.join(tmp_path, "cache.sqlite"))
+    stale = datetime.now(timezone.utc) - timedelta(seconds=SUMMARY_MAX_AGE + 3600)
+    fresh = datetime.now(timezone.utc)
+    for index, summarized_at in ((0, stale), (1, fresh)):
+        cache.put_nlp(text_hash(format_article(df.loc[index]), SUMMARY_VERSION),
+                      {"heading": "Cached", "summary": "Cached", "summarized_at": summarized_at.isoformat()})
+    chain = CountingChain()
+
+    out = summarize_frame(df, chain=chain, cache=cache)
+
+    assert chain.calls == 1
+    assert out.loc[0, "summary"] == "Fresh summary"
+    assert out.loc[0, "summarized_at"] > stale
+    assert out.loc[1, "summary"] == "Cached"
+    cache.close()
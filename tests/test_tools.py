@@ -0,0 +1,42 @@
+import os
+
+import pandas as pd
+import pytest
+
+from agents.tools import Bq_tools
+from benchmarks import fakes, scenarios
+from common.data_io import NEWS_SCHEMA, write_frame
+
+QUESTION = "What happened with OpenAI and the new model release?"
+
+
+@pytest.fixture
+def news():
+    return scenarios.synthetic_news(40)
+
+
+def test_semantic_query_without_vectors_uses_local_keyword_search(news, tmp_path, monkeypatch):
+    monkeypatch.delenv("PROJECT_ID", raising=False)
+    tools = Bq_tools(index_path=write_frame(news, os.path.join(tmp_path, "news.parquet"), NEWS_SCHEMA),
+                     embeddings_dir=str(tmp_path))
+
+    assert tools.get_news_by_search_term(QUESTION) == []
+    rows = tools.get_news_by_semantic_query(QUESTION)
+
+    assert rows and all("OpenAI" in row["extracted_text"] for row in rows)
+
+
+def test_semantic_query_without_vectors_or_snapshot_queries_bigquery_keywords(news, tmp_path, monkeypatch):
+    monkeypatch.setenv("PROJECT_ID", "test")
+    bigquery = fakes.FakeBigQueryClient()
+    fakes.install(bigquery=bigquery)
+    now = pd.Timestamp.now(tz="UTC")
+    bigquery.tables["news_data"] = {
+        "schema": [], "modified": now, "time_partitioning": None,
+        "rows": {row["url"]: dict(row, ingested_at=now) for row in news.to_dict(orient="records")},
+    }
+    tools = Bq_tools(index_path=None, embeddings_dir=str(tmp_path))
+
+    rows = tools.get_news_by_semantic_query(QUESTION)
+
+    assert rows and all("OpenAI" in row["extracted_text"] for row in rows)